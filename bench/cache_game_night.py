@@ -0,0 +1,107 @@
+"""
+Cache hit rate over a simulated game night, comparing the previous strategy
+(clear every match cache on each write) with write-through patching.
+
+The simulation uses the repository's real cache keys and patch functions over
+an in-memory dataset. Run from the repository root:
+    PYTHONPATH=src python bench/cache_game_night.py
+"""
+import asyncio
+import random
+
+from repos.cache import RepoCache
+from repos.match_cache import (patch_player_history, patch_player_stats, player_history_key, player_matches_tag,
+                               player_stats_key)
+from repos.match_history import HISTORY_CACHE_SIZE, history_entry, history_page, recent_history
+from repos.stats_aggregates import aggregate_id, build_aggregates, empty_aggregate, merge_deltas, result_deltas
+
+SEASON = 3
+PLAYERS = [f"player{i}" for i in range(10)]
+MATCHES = 8
+
+
+class Doc:
+    def __init__(self, _id, data):
+        self.id = _id
+        self.data = data
+
+    def get(self, field):
+        return self.data.get(field)
+
+    def to_dict(self):
+        return self.data
+
+
+class GameNight:
+    def __init__(self, write_through):
+        self.write_through = write_through
+        self.matches = []
+        self.cache = RepoCache()
+
+        @self.cache.cached(tags=["stats"], key=player_stats_key)
+        async def player_stats(mode, season_id):
+            finished = [m.to_dict() for m in self.matches if m.get("result") != "UNFINISHED"]
+            aggregates = build_aggregates(finished, lambda m: SEASON)
+            return aggregates.get(aggregate_id(season_id, mode), empty_aggregate(season_id, mode))
+
+        @self.cache.cached(tags=lambda player_id: ["matches", player_matches_tag(player_id)], key=player_history_key)
+        async def recent(player_id):
+            played = [history_entry(m.id, m.to_dict(), player_id) for m in reversed(self.matches)
+                      if m.get("result") != "UNFINISHED" and player_id in m.get("blue_team")["players"] +
+                      m.get("red_team")["players"]]
+            return recent_history(played[:HISTORY_CACHE_SIZE + 1])
+
+        self.player_stats = player_stats
+        self.recent = recent
+
+    async def history(self, player_id, limit):
+        return history_page(await self.recent(player_id), limit)
+
+    async def store_match(self, blue, red):
+        match = Doc(f"match{len(self.matches)}", {
+            "timestamp": len(self.matches), "mode": len(blue), "result": "UNFINISHED",
+            "blue_team": {"players": blue}, "red_team": {"players": red},
+        })
+        self.matches.append(match)
+        if not self.write_through:
+            self.cache.invalidate("matches")
+        return match
+
+    async def set_match_victory(self, match, result):
+        deltas = merge_deltas(result_deltas(match.to_dict(), result))
+        match.data["result"] = result
+        if self.write_through:
+            patch_player_history(self.cache, match)
+            patch_player_stats(self.cache, SEASON, match.get("mode"), deltas, 1)
+        else:
+            self.cache.invalidate("matches", "stats")
+
+    async def play(self, seed=42):
+        rng = random.Random(seed)
+        for _ in range(MATCHES):
+            await self.player_stats(0, SEASON)  # /sortear ratings
+            players = rng.sample(PLAYERS, 10)
+            match = await self.store_match(players[:5], players[5:])
+
+            for mode in (0, 5):
+                await self.player_stats(mode, SEASON)  # /vitorias
+            await self.player_stats(0, SEASON)  # /winrate
+            for player_id in rng.sample(PLAYERS, 3):
+                await self.history(player_id, 10)  # /historico
+
+            await self.set_match_victory(match, rng.choice(["BLUE", "RED"]))
+        metrics = self.cache.metrics().values()
+        hits = sum(m["hits"] for m in metrics)
+        return hits / (hits + sum(m["misses"] for m in metrics))
+
+
+async def main():
+    cleared = await GameNight(write_through=False).play()
+    patched = await GameNight(write_through=True).play()
+    print(f"{MATCHES} matches, {len(PLAYERS)} players")
+    print(f"clear on write:      {cleared:.0%} hit rate")
+    print(f"write-through patch: {patched:.0%} hit rate")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
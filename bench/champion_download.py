@@ -0,0 +1,81 @@
+"""
+Compare the legacy thread-per-request download of the champion roster with the
+pooled async client, against a local Data Dragon stand-in with simulated latency,
+then a cold startup with an empty asset store against a warm restart from disk.
+
+Needs the packages in bench/requirements.txt. Run from the repository root:
+    PYTHONPATH=src:. python bench/champion_download.py
+"""
+import asyncio
+import tempfile
+import time
+from queue import Queue, Empty
+from threading import Thread
+from unittest.mock import patch
+
+import requests
+
+from repos import champions_repo
+from repos.asset_store import AssetStore
+from repos.http_client import HttpClient
+from bench.fake_ddragon import FakeDataDragon
+
+CHAMPIONS = 170
+LATENCY = 0.02
+
+
+def legacy_download(url, names):
+    q = Queue()
+    for name in names:
+        q.put(name)
+
+    def fetch():
+        while True:
+            try:
+                name = q.get(block=False)
+            except Empty:
+                return
+            requests.get(f"{url}/cdn/14.1.1/img/champion/{name}.png")
+            q.task_done()
+
+    for _ in range(10):
+        Thread(target=fetch, daemon=True).start()
+    q.join()
+
+
+async def pooled_download(store):
+    async with HttpClient() as client:
+        await champions_repo.ImageDict(store).load(client)
+
+
+def timed_download(store):
+    start = time.perf_counter()
+    asyncio.run(pooled_download(store))
+    return time.perf_counter() - start
+
+
+def main():
+    champions = {f"Champion{i}": bytes(12_000) for i in range(CHAMPIONS)}
+    ddragon = FakeDataDragon(["14.1.1"], champions, latency=LATENCY)
+
+    start = time.perf_counter()
+    legacy_download(ddragon.url, champions)
+    legacy_time = time.perf_counter() - start
+    legacy_connections = ddragon.connections
+
+    ddragon.connections = 0
+    with patch.object(champions_repo, "BASE_API_URL", ddragon.url), tempfile.TemporaryDirectory() as tmp:
+        store = AssetStore(tmp)
+        pooled_time = timed_download(store)
+        pooled_connections = ddragon.connections
+        warm_time = timed_download(store)
+
+    print(f"{CHAMPIONS} champions, {LATENCY * 1000:.0f}ms simulated latency")
+    print(f"thread pool + requests: {legacy_time:.2f}s, {legacy_connections} connections")
+    print(f"pooled async client:    {pooled_time:.2f}s, {pooled_connections} connections")
+    print(f"warm restart from disk: {warm_time:.2f}s")
+    ddragon.close()
+
+
+if __name__ == "__main__":
+    main()
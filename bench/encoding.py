@@ -0,0 +1,54 @@
+"""
+Encode time and byte size of a 10-champion team image for every encoding mode.
+Tiles are synthetic (gradients plus blurred noise) to approximate splash art.
+
+Run from the repository root:
+    PYTHONPATH=src python bench/encoding.py
+"""
+import timeit
+
+from PIL import Image, ImageChops, ImageFilter
+
+from repos.champions_repo import TILE_SIZE
+from utils.embed import IMAGE_ENCODINGS, encode_image, number_badge
+
+ROUNDS = 50
+
+
+def synthetic_tile(seed):
+    size = (TILE_SIZE, TILE_SIZE)
+    channels = [
+        ImageChops.add(
+            Image.linear_gradient("L").rotate(seed * 37 + offset * 90).resize(size),
+            Image.effect_noise(size, 30 + offset * 10).filter(ImageFilter.GaussianBlur(1)),
+            scale=1.6,
+        )
+        for offset in range(3)
+    ]
+    return Image.merge("RGB", channels).convert("RGBA")
+
+
+def team_image(count=10):
+    image = Image.new('RGBA', (680, 281), (255, 0, 0, 0))
+    x_offset, y_offset = 10, 10
+    for idx in range(count):
+        image.paste(synthetic_tile(idx), (x_offset, y_offset))
+        badge, (badge_x, badge_y) = number_badge(idx + 1)
+        image.alpha_composite(badge, (x_offset + 5 + badge_x, y_offset + badge_y))
+        x_offset += 133
+        if x_offset >= 670:
+            x_offset, y_offset = 10, y_offset + 133
+    return image
+
+
+def main():
+    image = team_image()
+    print(f"{'mode':>12} | {'encode':>9} | {'size':>9}")
+    for encoding in IMAGE_ENCODINGS:
+        elapsed = timeit.timeit(lambda: encode_image(image, encoding), number=ROUNDS) / ROUNDS
+        size = len(encode_image(image, encoding))
+        print(f"{encoding:>12} | {elapsed * 1000:>7.2f}ms | {size / 1024:>6.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeDataDragon:
+    """
+    Local stand-in for the Data Dragon CDN, with ETag revalidation support.
+    """
+
+    def __init__(self, versions, champions, latency=0):
+        self.versions = versions
+        self.champions = champions
+        self.latency = latency
+        self.failures = {}
+        self.requests = []
+        self.connections = 0
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def do_GET(self):
+                fake.requests.append(self.path)
+                time.sleep(fake.latency)
+
+                if fake.failures.get(self.path):
+                    fake.failures[self.path] -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                parts = self.path.strip("/").split("/")
+
+                if self.path == "/api/versions.json":
+                    return self._send(json.dumps(fake.versions).encode())
+
+                if parts[-1] == "champion.json":
+                    data = {name: {"name": name.upper()} for name in fake.champions}
+                    return self._send(json.dumps({"data": data}).encode())
+
+                if parts[-2] == "champion":
+                    content = fake.champions[parts[-1].removesuffix(".png")]
+                    etag = f'"{hashlib.md5(content).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    return self._send(content, {"ETag": etag})
+
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send(self, content, headers=None):
+                self.send_response(200)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def image_requests(self):
+        return [path for path in self.requests if path.endswith(".png")]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
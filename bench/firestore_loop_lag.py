@@ -0,0 +1,61 @@
+"""
+Event loop lag while a season of matches is streamed from Firestore, comparing
+the blocking sync client with the repository's async client. Meanwhile a few
+simulated commands keep running, and their response time shows whether they
+queue behind the query.
+
+Needs FIREBASE_CREDENTIALS pointing at a project (or FIRESTORE_EMULATOR_HOST
+set to a seeded emulator). Run from the repository root:
+    PYTHONPATH=src python bench/firestore_loop_lag.py
+"""
+import asyncio
+import time
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+import repos.firebase_repo as repo
+from utils.loop_lag import LoopLagMonitor
+
+COMMANDS = 20
+
+
+def sync_finished_matches():
+    query = firestore.client().collection("matches").where(filter=FieldFilter("finished", "==", True))
+    return list(query.stream())
+
+
+async def async_finished_matches():
+    query = repo.db.collection("matches").where(filter=FieldFilter("finished", "==", True))
+    return [match async for match in query.stream()]
+
+
+async def simulated_command(latencies):
+    start = time.perf_counter()
+    await asyncio.sleep(0.01)
+    latencies.append(time.perf_counter() - start)
+
+
+async def measure(load_matches):
+    latencies = []
+    async with LoopLagMonitor() as monitor:
+        commands = [asyncio.create_task(simulated_command(latencies)) for _ in range(COMMANDS)]
+        start = time.perf_counter()
+        matches = await load_matches()
+        query_time = time.perf_counter() - start
+        await asyncio.gather(*commands)
+    return len(matches), query_time, monitor.max_lag, max(latencies)
+
+
+async def main():
+    async def blocking():
+        return sync_finished_matches()
+
+    for name, load_matches in (("sync client", blocking), ("async client", async_finished_matches)):
+        count, query_time, max_lag, slowest = await measure(load_matches)
+        print(f"{name:>12}: {count} matches in {query_time * 1000:.0f}ms | max loop lag {max_lag * 1000:.0f}ms | "
+              f"slowest concurrent command {slowest * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
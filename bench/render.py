@@ -0,0 +1,94 @@
+"""
+Time the team image composition before (PNG decode + text rasterisation per
+champion) and after (sprite atlas crops + pre-rendered badges). The PNG
+columns encode on every round, bypassing the cache of encoded team images.
+
+Run from the repository root:
+    PYTHONPATH=src python bench/render.py
+"""
+import io
+import os
+import tempfile
+import timeit
+
+from PIL import Image, ImageDraw
+
+from repos.asset_store import AssetStore
+from repos.champions_repo import ImageDict, TILE_SIZE
+from repos.sprite_atlas import SpriteAtlas
+from utils.embed import compose_champions_image, encode_champions_image
+
+CHAMPIONS = 170
+ROUNDS = 200
+
+
+def legacy_compose(champions_list, images):
+    max_width, max_height = 680, 281
+    new_im = Image.new('RGBA', (max_width, max_height), (255, 0, 0, 0))
+    new_im_draw = ImageDraw.Draw(new_im)
+
+    x_offset = 10
+    y_offset = 10
+    for idx, champion in enumerate(champions_list):
+        img = Image.open(io.BytesIO(images[champion]))
+        new_im.paste(img, (x_offset, y_offset))
+
+        new_im_draw.text((x_offset + 5, y_offset), str(idx + 1),
+                         font_size=30, fill="white", stroke_width=2, stroke_fill="black")
+
+        x_offset += 133
+        if x_offset >= max_width - 10:
+            x_offset = 10
+            y_offset += 133
+
+    return new_im
+
+
+def legacy_image_from_champions(champions_list, images):
+    new_im = legacy_compose(champions_list, images)
+
+    image_buffer = io.BytesIO()
+    new_im.save(image_buffer, format='PNG')
+    image_buffer.seek(0)
+    return image_buffer
+
+
+def build_roster(root):
+    store = AssetStore(root)
+    data = ImageDict(store)
+    data.version = "bench"
+    images = {}
+    for i in range(CHAMPIONS):
+        content = io.BytesIO()
+        Image.frombytes("RGB", (TILE_SIZE, TILE_SIZE), os.urandom(TILE_SIZE * TILE_SIZE * 3)).save(content, "PNG")
+        images[f"Champion{i}"] = content.getvalue()
+        data[f"Champion{i}"] = {"name": f"Champion {i}", "blob": store.write_blob(content.getvalue())}
+
+    os.makedirs(store.version_dir(data.version), exist_ok=True)
+    SpriteAtlas.build(store.version_dir(data.version),
+                      ((name, Image.open(io.BytesIO(images[name])).convert("RGBA")) for name in data), TILE_SIZE)
+    data.atlas = SpriteAtlas.open(store.version_dir(data.version))
+    return data, images
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        data, images = build_roster(tmp)
+
+        print(f"{'champions':>9} | {'compose before':>14} | {'compose after':>13} | "
+              f"{'with PNG before':>15} | {'with PNG after':>14}")
+        for count in (3, 4, 5, 10):
+            champions = [f"Champion{i * 7}" for i in range(count)]
+            timings = [
+                timeit.timeit(lambda: render(champions, source), number=ROUNDS) / ROUNDS * 1000
+                for render, source in (
+                    (legacy_compose, images), (compose_champions_image, data),
+                    (legacy_image_from_champions, images), (encode_champions_image, data),
+                )
+            ]
+            print(f"{count:>9} | {timings[0]:>12.2f}ms | {timings[1]:>11.2f}ms | "
+                  f"{timings[2]:>13.2f}ms | {timings[3]:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Event loop lag during a burst of PNG renders, run inline on the loop and then
+offloaded to the render pool.
+
+Run from the repository root:
+    PYTHONPATH=src python bench/render_pool_lag.py
+"""
+import asyncio
+import io
+import os
+
+from PIL import Image
+
+from utils.loop_lag import LoopLagMonitor
+from utils.render_pool import RenderPool
+
+NOISE = Image.frombytes("RGB", (680, 281), os.urandom(680 * 281 * 3))
+ROUNDS = 10
+
+
+def render():
+    image_buffer = io.BytesIO()
+    NOISE.convert("RGBA").save(image_buffer, format="PNG")
+    return image_buffer.getvalue()
+
+
+async def burst(pool):
+    async with LoopLagMonitor() as monitor:
+        for _ in range(ROUNDS):
+            if pool is not None:
+                await asyncio.gather(pool.run(render), pool.run(render))
+            else:
+                render()
+                render()
+                await asyncio.sleep(0)
+    return monitor
+
+
+def main():
+    pool = RenderPool(workers=2)
+    for name, runner in (("inline", None), ("render pool", pool)):
+        monitor = asyncio.run(burst(runner))
+        print(f"{name:>11}: max loop lag {monitor.max_lag * 1000:.1f}ms, mean {monitor.mean_lag * 1000:.1f}ms")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
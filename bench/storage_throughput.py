@@ -0,0 +1,96 @@
+"""
+Throughput of the match and stats flows against the memory or sqlite storage
+backend loaded with a synthetic dataset. Run from the repository root:
+    PYTHONPATH=src:. python bench/storage_throughput.py [memory|sqlite] [matches]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BACKEND = sys.argv[1] if len(sys.argv) > 1 else "memory"
+os.environ["STORAGE_BACKEND"] = BACKEND
+
+import repos.memory_repo as memory_repo  # noqa: E402
+from repos import sqlite_repo  # noqa: E402
+from repos.stats_aggregates import season_id_at  # noqa: E402
+from repos.storage import repo  # noqa: E402
+from bench.synthetic_dataset import generate  # noqa: E402
+from team_generator.generator import generate_team  # noqa: E402
+
+CHAMPIONS = [f"Champion{i}" for i in range(160)]
+ITERATIONS = 2000
+
+
+async def measure(name, flow, iterations=ITERATIONS):
+    start = time.perf_counter()
+    for i in range(iterations):
+        await flow(i)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {iterations / elapsed:>10.0f} ops/s  {elapsed / iterations * 1e6:>8.1f} us/op")
+
+
+def load_sqlite(directory, players, match_docs, seasons):
+    sqlite_repo.SQLITE_PATH = os.path.join(directory, "bench.db")
+    conn = sqlite_repo.connect(sqlite_repo.SQLITE_PATH)
+    bounds = [(season["id"], season["start"]) for season in seasons]
+    with conn:
+        conn.execute("DELETE FROM seasons")
+        conn.executemany('INSERT INTO seasons (doc_id, id, start, "end") VALUES (?, ?, ?, ?)',
+                         [(s["_id"], s["id"], sqlite_repo.to_text(s["start"]), sqlite_repo.to_text(s["end"]))
+                          for s in seasons])
+        conn.executemany("INSERT INTO players (id, nome, discord_id) VALUES (?, ?, ?)",
+                         [(p["_id"], p["nome"], p["discord_id"]) for p in players])
+        for match in match_docs:
+            sqlite_repo.insert_match(conn, match["_id"], match, season_id_at(bounds, match["timestamp"]))
+    sqlite_repo.rebuild_aggregates(conn)
+    conn.close()
+
+
+async def main(matches, directory):
+    logging.disable(logging.INFO)
+    players, match_docs, seasons = generate(matches=matches)
+
+    start = time.perf_counter()
+    if BACKEND == "sqlite":
+        load_sqlite(directory, players, match_docs, seasons)
+    else:
+        memory_repo.load_dataset(players, match_docs, seasons)
+    print(f"Loaded {matches} matches, {len(players)} players into {BACKEND} in {time.perf_counter() - start:.2f}s")
+
+    await repo.add_active_players([player["discord_id"] for player in players[:10]])
+    season = await repo.get_last_season()
+
+    async def match_flow(i):
+        active = await repo.get_active_players()
+        result = await generate_team(active, list(CHAMPIONS), False, 0)
+        match_id = await repo.store_match(result)
+        await repo.set_match_victory(match_id, "BLUE" if i % 2 else "RED")
+
+    async def victories(i):
+        await repo.get_players()
+        await repo.get_player_stats((0, 5, 4, 3)[i % 4], season)
+
+    async def history(i):
+        await repo.get_player_by_discord_id(players[i % len(players)]["discord_id"])
+        await repo.get_match_history(players[i % len(players)]["_id"], 10)
+
+    async def profile(i):
+        await repo.get_player_profile(players[i % len(players)]["_id"])
+
+    await measure("/sortear + result", match_flow)
+    await measure("/vitorias", victories)
+    await measure("/historico", history)
+    await measure("/perfil", profile, iterations=20)
+
+    start = time.perf_counter()
+    counted = await repo.rebuild_stats_aggregates()
+    print(f"Rebuilt aggregates from {counted} matches in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000, tmp))
+        sqlite_repo.executor.shutdown()
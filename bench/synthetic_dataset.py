@@ -0,0 +1,37 @@
+"""
+Synthetic players, seasons and matches for benchmarks, in the raw document
+shape taken by repos.memory_repo.load_dataset.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+MODES = (5, 5, 5, 4, 3)
+
+
+def generate(players=60, matches=100_000, seasons=5, seed=42):
+    rng = random.Random(seed)
+    player_docs = [{"_id": f"player{i:04d}", "nome": f"Jogador {i}", "discord_id": 10_000 + i} for i in range(players)]
+    player_ids = [player["_id"] for player in player_docs]
+
+    step = timedelta(minutes=30)
+    season_length = matches // seasons * step
+    season_docs = [
+        {"_id": f"season{i}", "id": i + 1, "start": START + i * season_length,
+         "end": START + (i + 1) * season_length if i < seasons - 1 else datetime(2100, 1, 1, tzinfo=timezone.utc)}
+        for i in range(seasons)
+    ]
+
+    match_docs = []
+    for i in range(matches):
+        mode = rng.choice(MODES)
+        picked = rng.sample(player_ids, mode * 2)
+        match_docs.append({
+            "_id": f"match{i:07d}",
+            "timestamp": START + i * step,
+            "mode": mode,
+            "result": rng.choice(("BLUE", "RED")) if i < matches - 1 else "UNFINISHED",
+            "blue_team": {"players": picked[:mode], "champions": []},
+            "red_team": {"players": picked[mode:], "champions": []},
+        })
+    return player_docs, match_docs, season_docs
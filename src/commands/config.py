@@ -1,14 +1,17 @@
 import logging
-import repos.firebase_repo as repo
+from repos.storage import repo
 
+from repos.cache import repo_cache
+from utils.embed import image_cache
+from utils.render_pool import render_pool
 from discord.bot import Bot
-from discord.commands import ApplicationContext
+from discord.commands import ApplicationContext, Option, OptionChoice
 
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("c/config")
 
 
-def register_config_commands(bot: Bot):
+def register_config_commands(bot: Bot, champions=None):
     @bot.slash_command(name="season", description="Cria uma season nova")
     async def create_season(
             ctx: ApplicationContext
@@ -21,3 +24,95 @@ def register_config_commands(bot: Bot):
         new_season = await repo.create_new_season()
 
         await ctx.followup.send(f"# Season {new_season.get('id')} iniciada!")
+
+    @bot.slash_command(name="formato", description="Define o formato das imagens dos campeões")
+    async def set_image_encoding(
+            ctx: ApplicationContext,
+            encoding: Option(str, "Formato da imagem", name="formato",
+                             choices=[OptionChoice("PNG", value="png"),
+                                      OptionChoice("PNG rápido", value="png-fast"),
+                                      OptionChoice("PNG com paleta", value="png-palette"),
+                                      OptionChoice("WebP sem perdas", value="webp"),
+                                      OptionChoice("JPEG", value="jpeg")])
+    ):
+        await ctx.response.defer(ephemeral=True)
+        if not ctx.user.guild_permissions.administrator:
+            await ctx.followup.send("Somente admins podem usar esse comando")
+            return
+
+        await repo.set_config("image_encoding", {str(ctx.guild_id): encoding})
+
+        await ctx.followup.send(f"As imagens dos campeões agora serão enviadas em {encoding}.")
+
+    @bot.slash_command(name="recalcular", description="Recalcula as estatísticas e os perfis a partir das partidas")
+    async def rebuild_stats(
+            ctx: ApplicationContext
+    ):
+        await ctx.response.defer(ephemeral=True)
+        if not ctx.user.guild_permissions.administrator:
+            await ctx.followup.send("Somente admins podem usar esse comando")
+            return
+
+        stamped = await repo.backfill_match_stamps()
+        matches = await repo.rebuild_stats_aggregates()
+        players = await repo.rebuild_player_index()
+
+        await ctx.followup.send(f"Estatísticas recalculadas a partir de {matches} partidas ({stamped} com a season "
+                                f"atualizada), perfis de {players} jogadores reindexados.")
+
+    @bot.slash_command(name="congelar", description="Regenera o ranking congelado de uma season encerrada")
+    async def freeze_leaderboards(
+            ctx: ApplicationContext,
+            season: Option(int, "Season", min_value=1)
+    ):
+        await ctx.response.defer(ephemeral=True)
+        if not ctx.user.guild_permissions.administrator:
+            await ctx.followup.send("Somente admins podem usar esse comando")
+            return
+
+        season_ref = await repo.get_season_by_id(season)
+        if season_ref is None or season_ref.id == (await repo.get_last_season()).id:
+            await ctx.followup.send("Somente seasons encerradas possuem ranking congelado")
+            return
+
+        snapshots = await repo.freeze_season_leaderboards(season_ref)
+
+        await ctx.followup.send(f"Ranking da season {season} regenerado para {snapshots} modos.")
+
+    @bot.slash_command(name="cache", description="Mostra as métricas do cache, das imagens e dos campeões")
+    async def cache_metrics(
+            ctx: ApplicationContext
+    ):
+        await ctx.response.defer(ephemeral=True)
+        if not ctx.user.guild_permissions.administrator:
+            await ctx.followup.send("Somente admins podem usar esse comando")
+            return
+
+        lines = [
+            f"`{name}`: {m['hits']} hits, {m['misses']} misses ({m['hit_rate']:.0%}), "
+            f"{m['avg_load_ms']:.0f}ms/leitura, {m['entries']} entradas, {m['bytes'] / 1024:.0f}KB"
+            for name, m in sorted(repo_cache.metrics().items())
+        ]
+        # Only the Firestore backend batches player reads
+        if hasattr(repo, "player_loader"):
+            loader = repo.player_loader.stats
+            lines.append(f"Jogadores: {loader['batches']} leituras em lote, {loader['fetched']} documentos, "
+                         f"{loader['hits']} do mapa de identidade")
+        lines.append(f"Total: {len(repo_cache)} entradas, {repo_cache.size / 1024 / 1024:.1f}MB "
+                     f"de {repo_cache.max_bytes / 1024 / 1024:.0f}MB")
+
+        images = image_cache.stats
+        lines.append(f"Imagens: {images['hits']} hits, {images['misses']} misses ({image_cache.hit_rate:.0%}), "
+                     f"{len(image_cache)} entradas, {image_cache.size / 1024 / 1024:.1f}MB "
+                     f"de {image_cache.max_bytes / 1024 / 1024:.0f}MB")
+        pool = render_pool.stats()
+        lines.append(f"Renderização: {pool['workers']} workers, {pool['queued']} na fila, {pool['running']} rodando, "
+                     f"{pool['completed']} concluídas")
+        if champions is not None:
+            if champions.version is None:
+                lines.append("Campeões: carregando")
+            else:
+                lines.append(f"Campeões: patch {champions.version}, atualizado em "
+                             f"{champions.last_refresh_duration:.2f}s")
+
+        await ctx.followup.send("\n".join(lines))
@@ -1,20 +1,33 @@
+import asyncio
+import io
+import os
 import discord
 import logging
-import repos.firebase_repo as repo
+from repos.storage import repo
 
 from discord.bot import Bot
 from discord.commands import Option, OptionChoice
 from discord_model.view import TeamSelectView, DeleteButtons, ResultButtons
-from repos.champions_repo import ImageDict
+from repos.champions_repo import PatchWatcher
 from team_generator.generator import generate_team
-from utils.embed import create_champion_embed, create_active_players_embed, create_active_team_embed
+from utils.embed import (create_champion_embed, create_active_players_embed, create_active_team_embed,
+                         DEFAULT_IMAGE_ENCODING, IMAGE_ENCODINGS)
+from utils.render_pool import render_pool
 
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("c/match")
 
+DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", 4))
+
 
 def register_match_commands(bot: Bot):
-    data = ImageDict()
+    champions = PatchWatcher()
+    dm_semaphore = asyncio.Semaphore(DM_CONCURRENCY)
+    background_tasks = set()
+
+    @bot.listen("on_ready", once=True)
+    async def load_champions():
+        champions.start()
 
     @bot.slash_command(name="adicionar", description="Adiciona jogadores a lista de ativos")
     async def add_active_players(
@@ -69,16 +82,101 @@ def register_match_commands(bot: Bot):
             embed = create_active_players_embed(players)
             await ctx.followup.send(embed=embed, view=DeleteButtons(players))
 
-    async def send_embed(player_info, embed):
-        player_discord = await bot.fetch_user(player_info.get("discord_id"))
+    async def get_discord_user(discord_id):
+        """
+        Resolve a user from the gateway cache, only falling back to the REST API on a miss.
+        """
+        return bot.get_user(discord_id) or await bot.fetch_user(discord_id)
+
+    async def send_embed(player_info, embed, image_url=None):
+        """
+        DM a player their champions. With `image_url` the embed references an image that was
+        already uploaded, otherwise the image is uploaded as an attachment.
+        Returns whether the message was sent and the CDN url of its embed image.
+        """
+        discord_id = player_info.get("discord_id")
+
+        async with dm_semaphore:
+            try:
+                player_discord = await get_discord_user(discord_id)
+
+                # Discord accepts any image url without fetching it, so the reference is best-effort
+                if image_url:
+                    referenced_embed = embed["embed"].copy()
+                    referenced_embed.set_image(url=image_url)
+                    await player_discord.send(embed=referenced_embed)
+                    return True, image_url
+
+                file = discord.File(fp=io.BytesIO(embed["file"].getvalue()), filename=embed["filename"])
+                message = await player_discord.send(file=file, embed=embed["embed"])
+                return True, uploaded_image_url(message)
+            except Exception as e:
+                logger.warning(f"Failed to send message to user {discord_id}, cause: {e}")
+                return False, None
+
+    def uploaded_image_url(message):
+        """
+        CDN url Discord resolved the attachment:// image of an embed to, None if the embed has no image.
+        """
+        if message.embeds and message.embeds[0].image and message.embeds[0].image.url:
+            url = message.embeds[0].image.url
+            return url if url.startswith("https://") else None
+        return None
+
+    async def send_team_embed(players, embed):
+        """
+        Upload the team image once, to the first player that can be reached, and reference
+        the uploaded image in the messages sent to the rest of the team. Until a sent message
+        shows the uploaded image in its embed, every player gets their own upload.
+        """
+        sent = []
+        image_url = None
+        remaining = list(players)
+        while remaining and image_url is None:
+            ok, image_url = await send_embed(remaining.pop(0), embed)
+            sent.append(ok)
+
+        results = await asyncio.gather(*[send_embed(player, embed, image_url) for player in remaining])
+        return sent + [ok for ok, _ in results]
+
+    async def send_team_embeds(ctx, result, data, encoding):
+        """
+        Render both team images and DM every player their champions, reporting who could not be reached.
+        """
+        blue_embed, red_embed = await asyncio.gather(
+            render_pool.run(create_champion_embed, result.get("blue_team").get("champions"), data,
+                            discord.Colour.blue(), 1, encoding),
+            render_pool.run(create_champion_embed, result.get("red_team").get("champions"), data,
+                            discord.Colour.red(), 2, encoding),
+        )
+
+        players = result.get("blue_team").get("players") + result.get("red_team").get("players")
+        blue_sent, red_sent = await asyncio.gather(
+            send_team_embed(result.get("blue_team").get("players"), blue_embed),
+            send_team_embed(result.get("red_team").get("players"), red_embed),
+        )
+
+        failed = [player.get("discord_id") for player, ok in zip(players, blue_sent + red_sent) if not ok]
+        logger.info(f"Champions sent to {len(players) - len(failed)}/{len(players)} players")
+        if failed:
+            await ctx.followup.send(
+                "Não foi possível enviar os campeões para: " + ", ".join(f"<@{_id}>" for _id in failed),
+                ephemeral=True
+            )
 
-        try:
-            embed["file"].seek(0)
-            file = discord.File(fp=embed["file"], filename="image.png")
+    def on_background_task_done(task):
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background task failed, cause: {task.exception()}")
 
-            await player_discord.send(file=file, embed=embed["embed"])
-        except Exception as e:
-            logger.warning(f"Failed to send message to user {player_discord.name}, cause: {e}")
+    def run_in_background(coro):
+        task = asyncio.create_task(coro)
+        background_tasks.add(task)
+        task.add_done_callback(on_background_task_done)
+
+    async def get_image_encoding(guild_id):
+        encoding = (await repo.get_config("image_encoding") or {}).get(str(guild_id), DEFAULT_IMAGE_ENCODING)
+        return encoding if encoding in IMAGE_ENCODINGS else DEFAULT_IMAGE_ENCODING
 
     @bot.slash_command(name="sortear", description="Sortea os times e campeões")
     async def sort_active_players(ctx,
@@ -86,22 +184,24 @@ def register_match_commands(bot: Bot):
                                                          min_value=1, max_value=10),
                                   all_seasons: Option(bool, "Usar dados de todas as seasons", name="todas_seasons", default=False)):
         await ctx.response.defer()
+        data = champions.data
+        if data is None:
+            await ctx.followup.send("Os campeões ainda estão carregando, tente novamente em instantes!")
+            return
+
         players = await repo.get_active_players()
         result = await generate_team(players, list(data), await repo.get_config("fixed_teams"), choices_number, all_seasons)
         match_id = await repo.store_match(result)
 
-        blue_embed = create_champion_embed(result.get("blue_team").get("champions"), data, discord.Colour.blue(), 1)
-        red_embed = create_champion_embed(result.get("red_team").get("champions"), data, discord.Colour.red(), 2)
+        encoding = await get_image_encoding(ctx.guild_id)
 
         blue_team_players = ""
         for idx, player in enumerate(result.get("blue_team").get("players")):
             blue_team_players += f"{idx + 1} - <@{player.get('discord_id')}>\n"
-            await send_embed(player, blue_embed)
 
         red_team_players = ""
         for idx, player in enumerate(result.get("red_team").get("players")):
             red_team_players += f"{idx + 1} - <@{player.get('discord_id')}>\n"
-            await send_embed(player, red_embed)
 
         embed = discord.Embed(
             title="Partidazuda",
@@ -112,8 +212,12 @@ def register_match_commands(bot: Bot):
         embed.add_field(name="Time vermelho (Lado direito)", value=red_team_players)
         await ctx.followup.send(embed=embed, view=ResultButtons(match_id, ctx.author.id))
 
+        run_in_background(send_team_embeds(ctx, result, data, encoding))
+
     @bot.slash_command(name="registrar", description="Adicionar jogador")
     async def register_new_player(ctx, nome: str, user: discord.User):
         await ctx.response.defer(ephemeral=True)
         await repo.set_player(nome, user)
         await ctx.followup.send(f"{nome} registrado com sucesso.")
+
+    return champions
@@ -1,10 +1,11 @@
 import logging
-import repos.firebase_repo as repo
+from repos.storage import repo
 
 from discord import Embed, User
 from discord.bot import Bot
 from discord.commands import ApplicationContext, Option, OptionChoice
-from utils.embed import create_match_history_embed
+from discord_model.view import HistoryPages
+from utils.embed import create_match_history_embed, create_profile_embed
 
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("c/stats")
@@ -31,15 +32,12 @@ def register_stats_commands(bot: Bot):
             await ctx.followup.send("Season invalida")
             return
 
-        matches = await repo.get_finished_matches(mode, season_ref)
+        leaderboard = await repo.get_season_leaderboard(mode, season_ref)
 
-        stats = {player.id: {"id": player.get("discord_id"), "wins": 0} for player in players}
-
-        for match in matches:
-            winning_team = match.get("blue_team") if match.get("result") == "BLUE" else match.get("red_team")
-
-            for player_id in winning_team["players"]:
-                stats[player_id]["wins"] += 1
+        stats = {
+            player.id: {"id": player.get("discord_id"), "wins": leaderboard["players"].get(player.id, {}).get("wins", 0)}
+            for player in players
+        }
 
         result_list = sorted(stats.items(), key=lambda x: x[1]["wins"], reverse=True)
 
@@ -76,19 +74,16 @@ def register_stats_commands(bot: Bot):
             await ctx.followup.send("Season invalida")
             return
 
-        matches = await repo.get_finished_matches(mode, season_ref)
-
-        stats = {player.id: {"id": player.get("discord_id"), "wins": 0, "losses": 0} for player in players}
-
-        for match in matches:
-            winning_team = match.get("blue_team") if match.get("result") == "BLUE" else match.get("red_team")
-            losing_team = match.get("red_team") if match.get("result") == "BLUE" else match.get("blue_team")
+        leaderboard = await repo.get_season_leaderboard(mode, season_ref)
 
-            for player_id in winning_team["players"]:
-                stats[player_id]["wins"] += 1
-
-            for player_id in losing_team["players"]:
-                stats[player_id]["losses"] += 1
+        stats = {}
+        for player in players:
+            player_stats = leaderboard["players"].get(player.id, {})
+            stats[player.id] = {
+                "id": player.get("discord_id"),
+                "wins": player_stats.get("wins", 0),
+                "losses": player_stats.get("losses", 0)
+            }
 
         result_list = []
         for player_id, stat in stats.items():
@@ -120,8 +115,26 @@ def register_stats_commands(bot: Bot):
         await ctx.response.defer(ephemeral=True)
         player = await repo.get_player_by_discord_id(user.id if user else ctx.author.id)
 
-        matches = await repo.get_matches_by_player(player.id, limit)
+        entries, next_cursor = await repo.get_match_history(player.id, limit)
+
+        embed = create_match_history_embed(entries, player)
+
+        await ctx.followup.send(embed=embed, view=HistoryPages(player, limit, next_cursor))
+
+    @bot.slash_command(name="perfil", description="Exibe as sequências e o desempenho de um jogador com e contra os outros")
+    async def profile(
+            ctx: ApplicationContext,
+            user: Option(User, "Usuário a ser consultado", name="usuário", required=False)
+    ):
+        await ctx.response.defer(ephemeral=True)
+        player = await repo.get_player_by_discord_id(user.id if user else ctx.author.id)
+        if player is None:
+            await ctx.followup.send("Jogador não encontrado")
+            return
+
+        player_profile = await repo.get_player_profile(player.id)
+        others = await repo.get_players_by_id(list(set(player_profile["allies"]) | set(player_profile["opponents"])))
 
-        embed = create_match_history_embed(matches, player)
+        embed = create_profile_embed(player_profile, player, {other.id: other.get("discord_id") for other in others})
 
         await ctx.followup.send(embed=embed)
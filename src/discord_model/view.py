@@ -1,7 +1,7 @@
 import discord
-import repos.firebase_repo as repo
+from repos.storage import repo
 
-from utils.embed import create_active_players_embed
+from utils.embed import create_active_players_embed, create_match_history_embed
 
 
 class TeamSelect(discord.ui.Select):
@@ -126,3 +126,42 @@ class ResultButtons(discord.ui.View):
 
         await repo.set_match_victory(self.match_id, result)
         await interaction.message.edit(view=None)
+
+
+class HistoryPages(discord.ui.View):
+    """
+    A view to page through the match history of a player.
+    """
+
+    def __init__(self, player, limit, next_cursor):
+        super().__init__(timeout=300)
+        self.player = player
+        self.limit = limit
+        # Cursors of the pages already shown, the first page has none
+        self.cursors = [None]
+        self.next_cursor = next_cursor
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_button_callback.disabled = len(self.cursors) == 1
+        self.next_button_callback.disabled = self.next_cursor is None
+
+    @discord.ui.button(label="Anterior", style=discord.ButtonStyle.gray)
+    async def previous_button_callback(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.cursors.pop()
+        await self._show_page(interaction)
+
+    @discord.ui.button(label="Próxima página", style=discord.ButtonStyle.blurple)
+    async def next_button_callback(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.cursors.append(self.next_cursor)
+        await self._show_page(interaction)
+
+    async def _show_page(self, interaction: discord.Interaction):
+        """
+        Show the page at the top of the cursor stack.
+        """
+        entries, self.next_cursor = await repo.get_match_history(self.player.id, self.limit, self.cursors[-1])
+        self._update_buttons()
+
+        embed = create_match_history_embed(entries, self.player, len(self.cursors))
+        await interaction.response.edit_message(embed=embed, view=self)
@@ -0,0 +1,94 @@
+"""
+Copy the bot's Firestore data (players, seasons, matches and matches_settings)
+into a SQLite database for the sqlite storage backend. Run from src/:
+    python import_firestore.py [--sqlite perso.db] [--replace]
+"""
+import argparse
+import logging
+import os
+
+import firebase_admin
+from dotenv import load_dotenv
+from firebase_admin import credentials, firestore
+
+from repos import sqlite_repo
+from repos.stats_aggregates import season_id_at
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("import_firestore")
+
+BATCH_SIZE = 500
+
+
+def import_firestore(db, conn, replace=False):
+    """
+    Import every document, returning the number of players, seasons and matches imported.
+    """
+    with conn:
+        if replace:
+            for table in ("match_players", "matches", "players", "seasons"):
+                conn.execute(f"DELETE FROM {table}")
+
+        players = [(player.id, player.get("nome"), player.get("discord_id")) for player in db.collection("players").stream()]
+        conn.executemany("INSERT OR REPLACE INTO players (id, nome, discord_id) VALUES (?, ?, ?)", players)
+
+        seasons = [season.to_dict() | {"doc_id": season.id} for season in db.collection("seasons").stream()]
+        if seasons:
+            conn.execute("DELETE FROM seasons")
+        conn.executemany(
+            'INSERT INTO seasons (doc_id, id, start, "end") VALUES (?, ?, ?, ?)',
+            [(season["doc_id"], season["id"], sqlite_repo.to_text(season["start"]),
+              sqlite_repo.to_text(season.get("end") or sqlite_repo.LAST_SEASON_END)) for season in seasons],
+        )
+
+        for doc_id in ("pool", "teams", "config"):
+            settings = db.collection("matches_settings").document(doc_id).get()
+            if settings.exists:
+                sqlite_repo.write_settings(conn, doc_id, settings.to_dict())
+
+    bounds = [(season["id"], season["start"]) for season in seasons]
+    matches = 0
+    last = None
+    while True:
+        query = db.collection("matches").order_by("__name__").limit(BATCH_SIZE)
+        if last is not None:
+            query = query.start_after(last)
+        page = list(query.stream())
+        if not page:
+            break
+
+        with conn:
+            for match in page:
+                data = match.to_dict()
+                if data.get("timestamp") is None:
+                    logger.warning(f"Skipping match {match.id} without a timestamp")
+                    continue
+                conn.execute("DELETE FROM match_players WHERE match_id = ?", (match.id,))
+                conn.execute("DELETE FROM matches WHERE id = ?", (match.id,))
+                sqlite_repo.insert_match(conn, match.id, data, season_id_at(bounds, data["timestamp"]))
+                matches += 1
+
+        last = page[-1]
+        logger.info(f"Imported {matches} matches")
+
+    sqlite_repo.rebuild_aggregates(conn)
+    for season_id, _ in sorted(bounds)[:-1]:
+        sqlite_repo.freeze_leaderboards(conn, season_id)
+    return len(players), len(seasons), matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the Firestore data into a SQLite database")
+    parser.add_argument("--sqlite", default=sqlite_repo.SQLITE_PATH, help="Path of the SQLite database")
+    parser.add_argument("--replace", action="store_true", help="Delete the players, seasons and matches already imported")
+    args = parser.parse_args()
+
+    load_dotenv()
+    firebase_admin.initialize_app(credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS")))
+
+    players, seasons, matches = import_firestore(firestore.client(), sqlite_repo.connect(args.sqlite), args.replace)
+    logger.info(f"Imported {players} players, {seasons} seasons and {matches} matches into {args.sqlite}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from commands.match import register_match_commands
 from commands.stats import register_stats_commands
 from commands.config import register_config_commands
 from commands.music import register_music_commands
+from repos.storage import repo
 
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("main")
@@ -17,8 +18,8 @@ logger = logging.getLogger("main")
 load_dotenv()
 bot = Bot()
 register_stats_commands(bot)
-register_match_commands(bot)
-register_config_commands(bot)
+champions = register_match_commands(bot)
+register_config_commands(bot, champions)
 register_music_commands(bot)
 
 
@@ -45,6 +46,7 @@ async def connect_nodes():
 @bot.event
 async def on_ready():
     logger.info(f"{bot.user} tá on pai!")
+    repo.start_listeners()
     await bot.change_presence(
         activity=Activity(
             type=ActivityType.custom,
@@ -0,0 +1,189 @@
+"""
+Reprocess the matches collection: every match goes through a transform and the
+changes it returns are written back in batches committed in parallel. Progress
+is checkpointed after every page, so an interrupted migration resumes where it
+stopped. Run from src/:
+    python migrate.py stamps [--dry-run] [--restart] [--page-size 500] [--concurrency 8]
+
+A transform is a name from TRANSFORMS or a "module:function" path. It receives
+the match dict and the (season id, start) pairs of every season, and returns
+the fields to update or None to leave the match untouched.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import time
+
+import firebase_admin
+from dotenv import load_dotenv
+from firebase_admin import credentials, firestore_async
+
+from repos.stats_aggregates import match_stamps
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("migrate")
+
+PAGE_SIZE = 500
+# Firestore batches hold up to 500 writes, smaller ones spread a page over more parallel commits
+BATCH_SIZE = 100
+CONCURRENCY = 8
+
+
+def stamps(match, seasons):
+    """
+    Stamp the season id, finished flag and players the season, result and history queries filter on.
+    """
+    changes = {field: value for field, value in match_stamps(match, seasons).items() if match.get(field) != value}
+    return changes or None
+
+
+TRANSFORMS = {"stamps": stamps}
+
+
+def load_transform(name):
+    if name in TRANSFORMS:
+        return TRANSFORMS[name]
+
+    module, _, function = name.partition(":")
+    if not function:
+        raise Exception(f"Unknown transform {name}, use one of {', '.join(TRANSFORMS)} or module:function")
+    return getattr(importlib.import_module(module), function)
+
+
+class ParallelWriter:
+    """
+    Writes (document reference, changes) updates in batches, with at most `concurrency` commits in flight.
+    """
+
+    def __init__(self, new_batch, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+        self.new_batch = new_batch
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.written = 0
+
+    async def write(self, updates):
+        chunks = [updates[start:start + self.batch_size] for start in range(0, len(updates), self.batch_size)]
+        await asyncio.gather(*(self._commit(chunk) for chunk in chunks))
+
+    async def _commit(self, chunk):
+        async with self.semaphore:
+            batch = self.new_batch()
+            for reference, changes in chunk:
+                batch.update(reference, changes)
+            await batch.commit()
+            self.written += len(chunk)
+
+
+def new_checkpoint(transform):
+    return {"transform": transform, "last_id": None, "read": 0, "updated": 0}
+
+
+def load_checkpoint(path, transform):
+    """
+    Progress of an interrupted migration with the same transform, or a fresh one.
+    """
+    if os.path.exists(path):
+        with open(path) as file:
+            checkpoint = json.load(file)
+        if checkpoint["transform"] == transform:
+            return checkpoint
+        logger.warning(f"Ignoring the checkpoint of transform {checkpoint['transform']} in {path}")
+    return new_checkpoint(transform)
+
+
+def save_checkpoint(path, checkpoint):
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(f"{path}.tmp", path)
+
+
+async def pages(collection, page_size, last_id=None):
+    """
+    The documents of a collection in pages, ordered by id and starting after last_id. The cursor is the id itself,
+    so resuming neither reads the last document nor needs it to still exist.
+    """
+    last = {"__name__": collection.document(last_id)} if last_id is not None else None
+    while True:
+        query = collection.order_by("__name__").limit(page_size)
+        if last is not None:
+            query = query.start_after(last)
+        page = [document async for document in query.stream()]
+        if not page:
+            return
+        yield page
+        last = page[-1]
+
+
+async def migrate(db, transform, checkpoint, checkpoint_path=None, page_size=PAGE_SIZE, batch_size=BATCH_SIZE,
+                  concurrency=CONCURRENCY):
+    """
+    Run a transform over every match after the checkpoint. The writes of a page are committed while the next one
+    is read, and the checkpoint only moves past a page once its writes are committed, so transforms must be
+    idempotent: a failed page is transformed again on resume. Without a checkpoint path nothing is written
+    (dry run). Returns the checkpoint.
+    """
+    seasons = [(season.get("id"), season.get("start")) async for season in db.collection("seasons").stream()]
+    writer = ParallelWriter(db.batch, batch_size, concurrency)
+    start, read = time.perf_counter(), 0
+
+    async def flush(pending):
+        if pending is not None:
+            task, progress = pending
+            await task
+            save_checkpoint(checkpoint_path, progress)
+
+    pending = None
+    async for page in pages(db.collection("matches"), page_size, checkpoint["last_id"]):
+        updates = []
+        for match in page:
+            changes = transform(match.to_dict(), seasons)
+            if changes:
+                updates.append((match.reference, changes))
+
+        await flush(pending)
+        checkpoint = {**checkpoint, "last_id": page[-1].id, "read": checkpoint["read"] + len(page),
+                      "updated": checkpoint["updated"] + len(updates)}
+        pending = None if checkpoint_path is None else (asyncio.create_task(writer.write(updates)), checkpoint)
+
+        read += len(page)
+        logger.info(f"{checkpoint['read']} matches read, {checkpoint['updated']} "
+                    f"{'to update' if checkpoint_path is None else 'updated'} "
+                    f"({read / (time.perf_counter() - start):.0f} docs/s)")
+
+    await flush(pending)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Done: {read} matches read and {writer.written} written in {elapsed:.1f}s "
+                f"({read / elapsed:.0f} docs/s read, {writer.written / elapsed:.0f} docs/s written)")
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a transform over every match")
+    parser.add_argument("transform", help=f"One of {', '.join(TRANSFORMS)} or module:function")
+    parser.add_argument("--dry-run", action="store_true", help="Count the matches the transform changes without writing")
+    parser.add_argument("--checkpoint", help="Progress file, migrate-<transform>.json by default")
+    parser.add_argument("--restart", action="store_true", help="Ignore the progress of a previous run")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Matches read per query")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Updates per committed batch")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Batches committed in parallel")
+    args = parser.parse_args()
+
+    transform = load_transform(args.transform)
+    checkpoint_path = args.checkpoint or f"migrate-{args.transform.replace(':', '-')}.json"
+    checkpoint = (load_checkpoint(checkpoint_path, args.transform) if not args.restart and not args.dry_run
+                  else new_checkpoint(args.transform))
+    if checkpoint["last_id"] is not None:
+        logger.info(f"Resuming after match {checkpoint['last_id']} ({checkpoint['read']} already read)")
+
+    load_dotenv()
+    firebase_admin.initialize_app(credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS")))
+
+    asyncio.run(migrate(firestore_async.client(), transform, checkpoint,
+                        None if args.dry_run else checkpoint_path, args.page_size, args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
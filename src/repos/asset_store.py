@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("asset_store")
+
+DEFAULT_CACHE_DIR = os.getenv("CHAMPIONS_CACHE_DIR", os.path.join(".cache", "champions"))
+MANIFEST_FILE = "manifest.json"
+BLOBS_DIR = "blobs"
+
+
+class AssetStore:
+    """
+    On-disk store of Data Dragon champion assets keyed by patch version.
+
+    Each version has its own manifest (champion id -> name, content hash and HTTP
+    validators, plus the champions that failed to download), while the image contents live in a shared content-addressed
+    ``blobs`` directory, so champions that did not change between patches are
+    stored only once.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(self.root, BLOBS_DIR), exist_ok=True)
+
+    def versions(self):
+        """
+        List the versions that have a manifest, newest first.
+        """
+        versions = [
+            entry for entry in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, entry, MANIFEST_FILE))
+        ]
+        return sorted(versions, key=_version_key, reverse=True)
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def load_manifest(self, version):
+        """
+        Load the manifest of a version, or None if it was never stored.
+        """
+        path = os.path.join(self.version_dir(version), MANIFEST_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return None
+
+    def previous_manifest(self, version):
+        """
+        Get the manifest of the newest stored version older than the given one.
+        """
+        for stored in self.versions():
+            if _version_key(stored) < _version_key(version):
+                return self.load_manifest(stored)
+        return None
+
+    def save_manifest(self, version, champions, missing=()):
+        """
+        Atomically write the manifest of a version.
+        """
+        directory = self.version_dir(version)
+        os.makedirs(directory, exist_ok=True)
+        atomic_write(
+            os.path.join(directory, MANIFEST_FILE),
+            json.dumps({"version": version, "champions": champions, "missing": list(missing)},
+                       ensure_ascii=False).encode("utf-8")
+        )
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, BLOBS_DIR, f"{digest}.png")
+
+    def has_blob(self, digest):
+        return os.path.isfile(self.blob_path(digest))
+
+    def read_blob(self, digest):
+        with open(self.blob_path(digest), "rb") as f:
+            return f.read()
+
+    def write_blob(self, content):
+        """
+        Store a content file and return its digest.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        if not self.has_blob(digest):
+            atomic_write(self.blob_path(digest), content)
+        return digest
+
+
+def _version_key(version):
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
+
+
+def atomic_write(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
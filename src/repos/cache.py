@@ -0,0 +1,244 @@
+import asyncio
+import functools
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("repo_cache")
+
+DEFAULT_TTL = int(os.getenv("REPO_CACHE_TTL", 7200))
+DEFAULT_BUDGET = int(float(os.getenv("REPO_CACHE_MB", 64)) * 1024 * 1024)
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    tags: frozenset
+    size: int
+    expires_at: float
+
+
+@dataclass
+class FunctionMetrics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    load_time: float = 0.0
+    max_load_time: float = 0.0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_load_ms": self.load_time / self.misses * 1000 if self.misses else 0.0,
+            "max_load_ms": self.max_load_time * 1000,
+        }
+
+
+class RepoCache:
+    """
+    Repository cache shared by every read function. Entries are declared with
+    dependency tags, so a write invalidates exactly the tags it touches. Memory
+    is bounded by an estimate of each entry's size, evicting the least recently
+    used entries first, and hits, misses and load latency are counted per function.
+
+    Invalidations bump a generation counter, and a value whose load started
+    before one of its tags or its key was invalidated is returned but not stored.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET, default_ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._metrics = {}
+        # cache key -> (future, tags) of the loads in flight
+        self._loading = {}
+        self._generation = 0
+        # tag or cache key -> generation it was last invalidated at
+        self._invalidated_at = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cached(self, tags=(), key=None, ttl=None):
+        """
+        Cache the results of an async function. `key` and `tags` may be callables receiving the
+        function's arguments; by default the key is the function name followed by its arguments.
+        """
+        def decorator(func):
+            metrics = self._metrics.setdefault(func.__name__, FunctionMetrics())
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key = key(*args, **kwargs) if key else ":".join([func.__name__, *map(str, args)])
+                entry = self._lookup(cache_key)
+                if entry is not None:
+                    metrics.hits += 1
+                    return entry.value
+
+                loading = self._loading.get(cache_key)
+                if loading is not None:
+                    metrics.hits += 1
+                    return await asyncio.shield(loading[0])
+
+                metrics.misses += 1
+                entry_tags = [func.__name__, *(tags(*args, **kwargs) if callable(tags) else tags)]
+                generation = self._generation
+                loading = self._loading[cache_key] = (asyncio.ensure_future(func(*args, **kwargs)), entry_tags)
+                start = time.perf_counter()
+                try:
+                    value = await asyncio.shield(loading[0])
+                finally:
+                    if self._loading.get(cache_key) is loading:
+                        del self._loading[cache_key]
+
+                elapsed = time.perf_counter() - start
+                metrics.load_time += elapsed
+                metrics.max_load_time = max(metrics.max_load_time, elapsed)
+
+                # A write during the load may have changed what was read
+                if all(self._invalidated_at.get(tag, 0) <= generation for tag in [cache_key, *entry_tags]):
+                    self.set(cache_key, value, entry_tags, ttl)
+                return value
+
+            wrapper.cache = self
+            return wrapper
+
+        return decorator
+
+    def get(self, cache_key):
+        entry = self._lookup(cache_key)
+        return entry.value if entry is not None else None
+
+    def set(self, cache_key, value, tags=None, ttl=None):
+        """
+        Store a value. Replacing an existing entry without `tags` keeps its tags and expiry.
+        """
+        previous = self._entries.get(cache_key)
+        if previous is not None and tags is None:
+            tags, expires_at = previous.tags, previous.expires_at
+        else:
+            expires_at = time.monotonic() + (ttl or self.default_ttl)
+        self._remove(cache_key)
+
+        entry = CacheEntry(value, frozenset(tags or ()), estimate_size(value), expires_at)
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[cache_key] = entry
+        self.size += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(cache_key)
+
+        while self.size > self.max_bytes:
+            evicted_key = next(iter(self._entries))
+            self._metric_for(evicted_key).evictions += 1
+            self._remove(evicted_key)
+
+    def discard_load(self, cache_key):
+        """
+        Keep the load in flight for a key, if any, from storing what it read. Used by writes that patch
+        entries in place, since a load that started before the write would otherwise cache the old value.
+        """
+        if cache_key in self._loading:
+            self._generation += 1
+            self._invalidated_at[cache_key] = self._generation
+            del self._loading[cache_key]
+
+    def items(self, tag):
+        """
+        (key, value) of every live entry with the given tag.
+        """
+        return [(cache_key, self.get(cache_key)) for cache_key in list(self._tags.get(tag, ()))
+                if self._lookup(cache_key, touch=False) is not None]
+
+    def invalidate(self, *tags):
+        self._generation += 1
+        for tag in tags:
+            self._invalidated_at[tag] = self._generation
+            # Later lookups start a fresh load instead of joining one that may read stale data
+            for cache_key, (_, loading_tags) in list(self._loading.items()):
+                if tag in loading_tags:
+                    del self._loading[cache_key]
+
+            keys = list(self._tags.get(tag, ()))
+            for cache_key in keys:
+                self._remove(cache_key)
+            logger.debug(f"Invalidated {len(keys)} entries tagged {tag}")
+
+    def clear(self):
+        self._generation += 1
+        for _, loading_tags in self._loading.values():
+            for tag in loading_tags:
+                self._invalidated_at[tag] = self._generation
+        self._loading.clear()
+        self._entries.clear()
+        self._tags.clear()
+        self.size = 0
+
+    def metrics(self):
+        """
+        Per-function counters, plus the number of entries and bytes each function holds.
+        """
+        result = {name: metrics.as_dict() for name, metrics in self._metrics.items()}
+        for name in result:
+            keys = self._tags.get(name, ())
+            result[name]["entries"] = len(keys)
+            result[name]["bytes"] = sum(self._entries[cache_key].size for cache_key in keys)
+        return result
+
+    def _lookup(self, cache_key, touch=True):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(cache_key)
+            return None
+        if touch:
+            self._entries.move_to_end(cache_key)
+        return entry
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            keys.discard(cache_key)
+            if not keys:
+                del self._tags[tag]
+
+    def _metric_for(self, cache_key):
+        return self._metrics.setdefault(cache_key.split(":", 1)[0], FunctionMetrics())
+
+
+def estimate_size(value, seen=None):
+    """
+    Approximate deep size of a cached value. Documents are measured by their data only.
+    """
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    elif hasattr(value, "to_dict"):
+        size += estimate_size(value.to_dict(), seen)
+    return size
+
+
+repo_cache = RepoCache()
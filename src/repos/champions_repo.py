@@ -1,77 +1,301 @@
-from queue import Queue, Empty
-from threading import Thread
+import asyncio
+import io
+import os
+import time
 
-import requests
 import logging
 
+from PIL import Image
+from repos.asset_store import AssetStore
+from repos.http_client import HttpClient
+from repos.sprite_atlas import SpriteAtlas
+from repos.tile_cache import TileCache
+
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("champions")
 
-BASE_API_URL = "https://ddragon.leagueoflegends.com"
+BASE_API_URL = os.getenv("DDRAGON_URL", "https://ddragon.leagueoflegends.com")
+PATCH_CHECK_INTERVAL = int(os.getenv("PATCH_CHECK_INTERVAL", 3600))
+TILE_SIZE = 120
 
 
-def download_champion_image(version, name):
+async def download_champion_image(client, version, name, etag=None, last_modified=None):
+    """
+    Download a champion image, revalidating against the given HTTP validators.
+    Returns the response, whose status is 304 when the cached content is still valid.
+    """
     url = f"{BASE_API_URL}/cdn/{version}/img/champion/{name}.png"
-    response = requests.get(url)
-    return response.content
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
 
+    return await client.get(url, headers=headers, accept=(200, 304))
 
-def get_last_league_version():
-    url = f"{BASE_API_URL}/api/versions.json"
 
-    response = requests.get(url)
+async def get_last_league_version(client):
+    url = f"{BASE_API_URL}/api/versions.json"
 
-    if response.status_code == 200:
-        return response.json()[0]
-    else:
-        logger.error("Error getting last league version: %s", response.text)
-        raise Exception(f"Error getting last league version")
+    try:
+        return (await client.get_json(url))[0]
+    except Exception as e:
+        logger.error("Error getting last league version: %s", e)
+        raise Exception(f"Error getting last league version") from e
 
 
 class ImageDict(dict):
-    def __init__(self):
+    """
+    Champion roster of a patch version, mapping each champion id to its name and
+    the digest of its image in the asset store. Tiles are served from the patch's
+    sprite atlas; any other size is decoded from disk on first use and kept in a
+    bounded LRU. Champions that failed to load are left out and listed in `missing`.
+    """
+
+    def __init__(self, store=None, tiles=None):
         super().__init__()
-        self.version = get_last_league_version()
-        self.__load_champions()
+        self.store = store or AssetStore()
+        self.tiles = tiles or TileCache()
+        self.atlas = None
+        self.version = None
+        self.load_time = None
+        self.missing = []
+        self.stats = {"disk": 0, "revalidated": 0, "downloaded": 0}
 
-    def __load_champions(self):
-        url = f"{BASE_API_URL}/cdn/{self.version}/data/en_US/champion.json"
+    async def load(self, client=None, version=None):
+        """
+        Load the roster of the given version (the latest one by default), from disk when possible.
+        Champions missing from disk are fetched again. Disk work runs in a worker thread, so loading
+        never blocks the event loop.
+        """
+        if client is None:
+            async with HttpClient() as client:
+                return await self.load(client, version)
+
+        start = time.perf_counter()
+        self.version = version or await self.__resolve_version(client)
+
+        manifest = await asyncio.to_thread(self.store.load_manifest, self.version)
+        if manifest:
+            await asyncio.to_thread(self.__load_from_manifest, manifest)
+        if not manifest or self.missing:
+            await self.__load_champions(client, manifest)
+
+        self.atlas = await asyncio.to_thread(self.__open_atlas)
+
+        self.load_time = time.perf_counter() - start
+        logger.info(f"Champions {self.version} loaded in {self.load_time:.2f}s ({self.stats['disk']} from disk, "
+                    f"{self.stats['revalidated']} revalidated, {self.stats['downloaded']} downloaded, "
+                    f"{len(self.missing)} missing)")
+        return self
+
+    def image(self, champion_name):
+        """
+        Read the encoded image of a champion from the asset store.
+        """
+        return self.store.read_blob(self[champion_name]["blob"])
+
+    def tile(self, champion_name, size=TILE_SIZE):
+        """
+        Get the decoded RGBA tile of a champion, resized to `size` pixels.
+        """
+        if self.atlas is not None and size == self.atlas.tile_size and champion_name in self.atlas:
+            return self.atlas.tile(champion_name)
+
+        return self.tiles.get_or_create((self.version, champion_name, size),
+                                        lambda: self.__decode_tile(champion_name, size))
+
+    def __decode_tile(self, champion_name, size):
+        tile = Image.open(io.BytesIO(self.image(champion_name))).convert("RGBA")
+        if tile.size != (size, size):
+            tile = tile.resize((size, size), Image.Resampling.LANCZOS)
+        return tile
+
+    def __open_atlas(self):
+        directory = self.store.version_dir(self.version)
+        try:
+            atlas = SpriteAtlas.open(directory)
+            if atlas is not None and set(atlas.offsets) == set(self):
+                return atlas
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable sprite atlas for {self.version}, cause: {e}")
+
+        try:
+            atlas = SpriteAtlas.build(
+                directory,
+                ((champion_name, self.__decode_tile(champion_name, TILE_SIZE)) for champion_name in self),
+                TILE_SIZE
+            )
+        except Exception as e:
+            logger.warning(f"Failed to build sprite atlas for {self.version}, cause: {e}")
+            return None
+
+        logger.info(f"Sprite atlas built for {self.version} ({len(atlas)} champions)")
+        return atlas
 
-        response = requests.get(url)
+    async def __resolve_version(self, client):
+        try:
+            return await get_last_league_version(client)
+        except Exception as e:
+            cached_versions = self.store.versions()
+            if not cached_versions:
+                raise
+            logger.warning(f"Using cached version {cached_versions[0]}, cause: {e}")
+            return cached_versions[0]
+
+    def __load_from_manifest(self, manifest):
+        self.missing = list(manifest.get("missing", []))
+        for champion_name, entry in manifest["champions"].items():
+            if not self.store.has_blob(entry["blob"]):
+                logger.warning(f"Image of champion {champion_name} is missing from disk, fetching it again")
+                self.missing.append(champion_name)
+                continue
+            self[champion_name] = {"name": entry["name"], "blob": entry["blob"]}
+            self.stats["disk"] += 1
+
+    async def __load_champions(self, client, manifest=None):
+        """
+        Fetch the champions not loaded from disk and store the manifest. Champions that fail are left out
+        and recorded as missing in the manifest, so the next load only fetches them.
+        """
+        url = f"{BASE_API_URL}/cdn/{self.version}/data/en_US/champion.json"
 
         logger.info("Downloading champions list")
-        if response.status_code == 200:
-            champions = response.json()['data']
+        try:
+            champions = (await client.get_json(url))['data']
+        except Exception as e:
+            logger.error("Error getting champions list: %s", e)
+            if manifest:
+                # Keep the champions read from disk, the missing ones are retried on the next load
+                return
+            raise Exception(f"Error getting champions list") from e
 
-            q = Queue()
+        previous = await asyncio.to_thread(self.store.previous_manifest, self.version)
+        previous_entries = previous["champions"] if previous else {}
+        pending = [champion_name for champion_name in champions if champion_name not in self]
 
-            def __fetch_champion(version):
-                finished = False
-                while not finished:
-                    try:
-                        champion_name = q.get(block=False)
-                        logger.info(f'Downloading champion {champion_name}')
-                        image = download_champion_image(version, champion_name)
-                        self[champion_name] = {
-                            "name": champions[champion_name]["name"],
-                            "image": image
-                        }
-                        q.task_done()
-                    except Empty:
-                        finished = True
+        results = await asyncio.gather(*[
+            self.__fetch_champion_entry(client, champion_name, champions[champion_name]["name"],
+                                        previous_entries.get(champion_name))
+            for champion_name in pending
+        ], return_exceptions=True)
 
-            for champion in champions:
-                q.put(champion)
+        entries = {champion_name: entry for champion_name, entry in (manifest or {"champions": {}})["champions"].items()
+                   if champion_name in self}
+        self.missing = []
+        for champion_name, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch champion {champion_name}, cause: {result}")
+                self.missing.append(champion_name)
+            else:
+                entries[champion_name] = result
 
-            for i in range(10):
-                t = Thread(target=__fetch_champion, daemon=True, args=(self.version,))
-                t.start()
+        if not entries:
+            raise Exception(f"Failed to fetch champions of {self.version}")
+        if self.missing:
+            logger.error(f"{len(self.missing)} champions of {self.version} failed to load, retrying them on the "
+                         f"next refresh: {', '.join(self.missing)}")
 
-            q.join()
+        await asyncio.to_thread(self.store.save_manifest, self.version, entries, self.missing)
+        logger.info("Download finished")
 
-            logger.info("Download finished")
+    async def __fetch_champion_entry(self, client, champion_name, display_name, previous_entry):
+        """
+        Fetch a single champion, reusing the stored content when the server reports it unchanged.
+        """
+        if previous_entry and self.store.has_blob(previous_entry["blob"]):
+            response = await download_champion_image(
+                client, self.version, champion_name, previous_entry.get("etag"), previous_entry.get("last_modified")
+            )
+        else:
+            previous_entry = None
+            logger.info(f'Downloading champion {champion_name}')
+            response = await download_champion_image(client, self.version, champion_name)
 
+        if response.status == 304:
+            digest = previous_entry["blob"]
+            self.stats["revalidated"] += 1
         else:
-            logger.error("Error getting champions list: %s", response.text)
-            raise Exception(f"Error getting champions list")
+            digest = await asyncio.to_thread(self.store.write_blob, response.content)
+            self.stats["downloaded"] += 1
+
+        self[champion_name] = {"name": display_name, "blob": digest}
+        return {
+            "name": display_name,
+            "blob": digest,
+            "etag": response.headers.get("ETag") or (previous_entry or {}).get("etag"),
+            "last_modified": response.headers.get("Last-Modified") or (previous_entry or {}).get("last_modified"),
+        }
+
+
+class PatchWatcher:
+    """
+    Keeps the champion roster on the latest League patch. A background task polls
+    the versions endpoint and, when a new patch is out, builds the new roster
+    incrementally before swapping it in, so in-flight draws keep using the
+    roster they started with.
+    """
+
+    def __init__(self, store=None, interval=PATCH_CHECK_INTERVAL):
+        self.store = store or AssetStore()
+        self.interval = interval
+        self.tiles = TileCache()
+        self.data = None
+        self.last_refresh_duration = None
+        self.last_refresh_at = None
+        self._task = None
+
+    @property
+    def version(self):
+        return self.data.version if self.data is not None else None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def refresh(self, client):
+        """
+        Load the latest patch if it differs from the current roster, or again if some of its champions failed to
+        load. Returns True when the roster was swapped.
+        """
+        try:
+            version = await get_last_league_version(client)
+        except Exception:
+            if self.data is not None:
+                return False
+            version = None
+
+        if self.data is not None and version == self.data.version and not self.data.missing:
+            return False
+
+        start = time.perf_counter()
+        try:
+            data = await ImageDict(self.store, self.tiles).load(client, version)
+        except Exception as e:
+            # Without a roster, serve the newest patch on disk and retry the new one on the next check
+            cached_versions = [] if self.data is not None else [
+                cached for cached in await asyncio.to_thread(self.store.versions) if cached != version
+            ]
+            if not cached_versions:
+                raise
+            logger.warning(f"Failed to load champions {version}, using cached version {cached_versions[0]}, cause: {e}")
+            data = await ImageDict(self.store, self.tiles).load(client, cached_versions[0])
+        previous_version = self.version
+        self.data = data
+        self.last_refresh_duration = time.perf_counter() - start
+        self.last_refresh_at = time.time()
+
+        logger.info(f"Champion roster swapped from {previous_version} to {self.version} "
+                    f"in {self.last_refresh_duration:.2f}s")
+        return True
+
+    async def _run(self):
+        async with HttpClient() as client:
+            while True:
+                try:
+                    await self.refresh(client)
+                except Exception as e:
+                    logger.error(f"Failed to refresh champion roster, cause: {e}")
 
+                await asyncio.sleep(self.interval if self.data is not None else min(self.interval, 60))
@@ -0,0 +1,37 @@
+import copy
+import uuid
+
+
+class Document:
+    """
+    Stand-in for a Firestore DocumentSnapshot, used by the storage backends that do not run on Firestore.
+    """
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def get(self, field):
+        """
+        Value of a field, nested fields given as a dotted path.
+        """
+        value = self._data
+        for key in field.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+def new_id():
+    """
+    Random document id, the same length as Firestore's auto ids.
+    """
+    return uuid.uuid4().hex[:20]
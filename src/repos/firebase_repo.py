@@ -1,11 +1,23 @@
+import asyncio
 import copy
+import logging
 import os
 import firebase_admin
-from aiocache import cached
 from firebase_admin import credentials
 from firebase_admin import firestore
-from google.cloud.firestore_v1.base_query import FieldFilter, Or
-from google.cloud.firestore_v1.field_path import FieldPath
+from firebase_admin import firestore_async
+from google.cloud.firestore_v1.base_query import FieldFilter
+from repos.cache import repo_cache
+from repos.match_cache import (patch_player_history, patch_player_index, patch_player_stats, player_history_key,
+                               player_index_key, player_matches_tag, player_stats_key)
+from repos.match_history import HISTORY_CACHE_SIZE, HISTORY_FIELDS, history_entry, history_page, page_of, recent_history
+from repos.player_directory import PlayerDirectory
+from repos.player_index import INDEX_FIELDS, build_player_index, index_entries, index_shard_id, player_profile
+from repos.player_loader import PlayerLoader
+from repos.settings_mirror import SettingsMirror, deep_merge
+from repos.stats_aggregates import (FINISHED_RESULTS, aggregate_id, aggregate_keys, build_aggregates,
+                                    empty_aggregate, leaderboard, match_players, match_stamps, merge_deltas,
+                                    result_deltas, season_closed, season_id_at)
 
 from dotenv import load_dotenv
 
@@ -14,7 +26,20 @@ load_dotenv()
 # Initialize Firebase
 cred = credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS"))
 app = firebase_admin.initialize_app(cred)
-db = firestore.client()
+db = firestore_async.client()
+# Snapshot listeners are only available on the sync client
+sync_db = firestore.client()
+
+FIRESTORE_IN_LIMIT = 30
+# Written once the stats aggregates were built from the matches. Recording a result creates the aggregate
+# documents too, so their existence does not tell whether the earlier matches were counted.
+STATS_META = "_meta"
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("firebase_repo")
+
+# Shared check that the stats aggregates exist, see ensure_stats_aggregates
+stats_aggregates_ready = None
 
 
 # Players Management
@@ -23,62 +48,132 @@ async def set_player(name, user):
     Add a new player to the 'players' collection.
     """
     players_ref = db.collection("players")
-    players_ref.add({"nome": name, "discord_id": user.id})
+    _, player_ref = await players_ref.add({"nome": name, "discord_id": user.id})
+
+    if player_directory.ready:
+        # Applied right away, the listener delivers the same document shortly after
+        player_directory.apply([("ADDED", await player_ref.get())])
+    else:
+        on_players_changed()
+
+
+async def fetch_players(ids):
+    """
+    Read the given player documents in a single batch, skipping the ones that do not exist.
+    """
+    players_ref = db.collection("players")
+    return [player async for player in db.get_all([players_ref.document(_id) for _id in ids]) if player.exists]
+
+
+player_loader = PlayerLoader(fetch_players)
+
+
+def on_players_changed():
+    repo_cache.invalidate("players")
+    player_loader.clear()
+
 
-    get_players.cache.clear()
-    get_player_by_id.cache.clear()
-    get_player_by_discord_id.cache.clear()
+player_directory = PlayerDirectory(on_change=on_players_changed)
+settings_mirror = SettingsMirror(on_change=lambda: repo_cache.invalidate("pool", "config"))
+
+
+def start_listeners():
+    """
+    Start the snapshot listeners that keep the in-memory mirrors current. Must run inside the event loop.
+    """
+    player_directory.watch(sync_db.collection("players"))
+    settings_mirror.watch(sync_db.collection("matches_settings"))
 
 
-@cached(ttl=7200)
 async def get_players():
     """
     Get all players from the 'players' collection.
     """
-    return list(db.collection("players").stream())
+    if player_directory.ready:
+        return player_directory.all()
+    return await stream_players()
+
+
+@repo_cache.cached(tags=["players"])
+async def stream_players():
+    """
+    Read the whole 'players' collection, used until the player directory is loaded.
+    """
+    players = [player async for player in db.collection("players").stream()]
+    player_loader.prime(players)
+    return players
 
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}")
 async def get_player_by_id(player_id):
     """
-    Get a single player document by its ID.
+    Get a single player document by its ID, or None if it does not exist.
     """
-    return db.collection("players").document(player_id).get()
+    if player_directory.ready:
+        return player_directory.get(player_id)
+    return await player_loader.load(player_id)
 
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}")
 async def get_player_by_discord_id(player_id):
     """
     Get a single player document by its discord ID.
     """
+    if player_directory.ready:
+        return player_directory.get_by_discord_id(player_id)
+    return await query_player_by_discord_id(player_id)
+
+
+@repo_cache.cached(tags=["players"])
+async def query_player_by_discord_id(player_id):
+    """
+    Query a player by its discord ID, used until the player directory is loaded.
+    """
     players_ref = db.collection("players")
-    query = players_ref.where(filter=FieldFilter("discord_id", "==", player_id)).limit(1).stream()
-    player = next(query, None)
-    return player
+    query = players_ref.where(filter=FieldFilter("discord_id", "==", player_id)).limit(1)
+    async for player in query.stream():
+        return player
+    return None
 
 
 async def get_players_by_id(ids):
     """
-    Get players whose IDs are in the provided list.
+    Get players whose IDs are in the provided list, in the order of the list.
     """
-    players_ref = db.collection("players")
-    result = []
-    result.extend(players_ref.where(
-        filter=FieldFilter(FieldPath.document_id(), "in", [players_ref.document(_id) for _id in ids])
-    ).stream())
-    return list(result)
+    if player_directory.ready:
+        return [player for player in map(player_directory.get, ids) if player is not None]
+    return await player_loader.load_many(ids)
 
 
 async def get_players_by_discord_id(discord_ids):
     """
     Get players whose Discord IDs are in the provided list.
     """
-    return db.collection("players").where(
-        filter=FieldFilter("discord_id", "in", discord_ids)
-    ).stream()
+    if player_directory.ready:
+        return [player for player in map(player_directory.get_by_discord_id, discord_ids) if player is not None]
+
+    async def query_chunk(chunk):
+        query = db.collection("players").where(filter=FieldFilter("discord_id", "in", chunk))
+        return [player async for player in query.stream()]
+
+    chunks = await asyncio.gather(*[query_chunk(discord_ids[start:start + FIRESTORE_IN_LIMIT])
+                                    for start in range(0, len(discord_ids), FIRESTORE_IN_LIMIT)])
+    players = [player for chunk in chunks for player in chunk]
+    player_loader.prime(players)
+    return players
 
 
 # Active Players Management
+async def write_settings(changes, write, *tags):
+    """
+    Await a write to matches_settings documents. Once the settings mirror is loaded, `changes`
+    ({doc id: change(document dict)}) are applied to the mirror right away and rolled back if the write fails.
+    """
+    if settings_mirror.ready:
+        await settings_mirror.write(changes, write)
+    else:
+        await write
+    repo_cache.invalidate(*tags)
+
+
 async def add_active_players(players):
     """
     Add players to the active pool.
@@ -86,12 +181,13 @@ async def add_active_players(players):
     players_ref = db.collection("matches_settings").document("pool")
     firebase_players = [p.id for p in await get_players_by_discord_id(players)]
 
-    if players_ref.get().exists:
-        players_ref.update({"list": firestore.ArrayUnion(firebase_players)})
-    else:
-        players_ref.set({"list": firebase_players})
+    def change(pool):
+        current = pool.get("list", [])
+        return {**pool, "list": current + [_id for _id in dict.fromkeys(firebase_players) if _id not in current]}
 
-    await get_active_players.cache.clear()
+    # Upsert, so the pool document does not have to be read first
+    await write_settings({"pool": change},
+                         players_ref.set({"list": firestore.ArrayUnion(firebase_players)}, merge=True), "pool")
 
 
 async def remove_active_player(player_id):
@@ -99,40 +195,57 @@ async def remove_active_player(player_id):
     Remove a player from the active pool.
     """
     players_ref = db.collection("matches_settings").document("pool")
-    players_ref.update({"list": firestore.ArrayRemove([player_id])})
+    def change(pool):
+        return {**pool, "list": [_id for _id in pool.get("list", []) if _id != player_id]}
 
-    await get_active_players.cache.clear()
+    await write_settings({"pool": change}, players_ref.update({"list": firestore.ArrayRemove([player_id])}), "pool")
 
 
 async def clear_active_players():
     """
     Clear the active players list and reset configurations.
     """
-    db.collection("matches_settings").document("pool").set({"list": []})
-    db.collection("matches_settings").document("teams").set({"A": [], "B": []})
+    settings_ref = db.collection("matches_settings")
+    batch = db.batch()
+    batch.set(settings_ref.document("pool"), {"list": []})
+    batch.set(settings_ref.document("teams"), {"A": [], "B": []})
+    batch.set(settings_ref.document("config"), {"fixed_teams": False}, merge=True)
 
-    await set_config("fixed_teams", False)
+    await write_settings({
+        "pool": lambda pool: {"list": []},
+        "teams": lambda teams: {"A": [], "B": []},
+        "config": lambda config: {**config, "fixed_teams": False},
+    }, batch.commit(), "pool", "config")
 
-    await get_active_players.cache.clear()
 
-
-@cached(ttl=7200)
 async def get_active_players():
     """
     Retrieve the list of active players or fixed teams if enabled.
     """
-    config = db.collection("matches_settings").document("config").get()
-    if config.get("fixed_teams"):
-        player_list = db.collection("matches_settings").document("teams").get()
+    if settings_mirror.ready:
+        return await resolve_active_players(settings_mirror.get("config"), settings_mirror.get("pool"),
+                                            settings_mirror.get("teams"))
+    return await read_active_players()
 
-        teams_discord = {
-            "A": await get_players_by_id(player_list.get("A")),
-            "B": await get_players_by_id(player_list.get("B"))
-        }
-        return teams_discord
-    else:
-        player_list = db.collection("matches_settings").document("pool").get().get("list")
-        return list(await get_players_by_id(player_list) if player_list else [])
+
+@repo_cache.cached(tags=["pool", "config", "players"])
+async def read_active_players():
+    """
+    Read the active players from the settings documents, used until the settings mirror is loaded.
+    """
+    settings_ref = db.collection("matches_settings")
+    config, pool, teams = await asyncio.gather(*[settings_ref.document(doc_id).get()
+                                                 for doc_id in ("config", "pool", "teams")])
+    return await resolve_active_players(config.to_dict() or {}, pool.to_dict() or {}, teams.to_dict() or {})
+
+
+async def resolve_active_players(config, pool, teams):
+    if config.get("fixed_teams"):
+        # Both teams are loaded in the same tick, so they share one batch read
+        team_a, team_b = await asyncio.gather(get_players_by_id(teams.get("A") or []),
+                                              get_players_by_id(teams.get("B") or []))
+        return {"A": team_a, "B": team_b}
+    return await get_players_by_id(pool.get("list") or [])
 
 
 # Fixed Teams Management
@@ -142,77 +255,292 @@ async def add_fixed_players(players, team):
     """
     players_ref = db.collection("matches_settings").document("teams")
     firebase_players = [p.id for p in await get_players_by_discord_id([player.id for player in players])]
-    players_ref.update({team: firebase_players})
-
-    await get_active_players.cache.clear()
+    await write_settings({"teams": lambda teams: {**teams, team: firebase_players}},
+                         players_ref.update({team: firebase_players}), "pool")
 
 
 # Match Management
 async def store_match(match):
     """
-    Store a match in the database.
+    Store a match in the database, stamped with the id of the current season.
     """
     match = copy.deepcopy(match)
     match["timestamp"] = firestore.SERVER_TIMESTAMP
+    match["season_id"] = (await get_last_season()).get("id")
     match["result"] = "UNFINISHED"
+    match["finished"] = False
     match["mode"] = len(match["red_team"]["players"])
     match["blue_team"]["players"] = [player.id for player in match["blue_team"]["players"]]
     match["red_team"]["players"] = [player.id for player in match["red_team"]["players"]]
-    result = db.collection("matches").add(match)
+    match["players"] = match_players(match)
+    result = await db.collection("matches").add(match)
 
-    await get_finished_matches.cache.clear()
-    await get_matches_by_player.cache.clear()
+    # Unfinished matches are not part of any cached list, so there is nothing to invalidate
     return result[1].id
 
 
 async def set_match_victory(match_id, result):
     """
-    Set the result of a match.
+    Set the result of a match, updating the stats aggregates it counts towards and the indexes of its
+    players in the same transaction. A result of a closed season also refreshes its frozen leaderboards.
     """
-    db.collection("matches").document(match_id).update({"result": result})
+    seasons = [(season.get("id"), season.get("start")) for season in await get_seasons()]
+    match_ref = db.collection("matches").document(match_id)
+
+    @firestore.async_transactional
+    async def record_result(transaction):
+        match = (await match_ref.get(transaction=transaction)).to_dict()
+        previous_result = match.get("result")
+        if previous_result == result:
+            return None
+
+        deltas = merge_deltas(result_deltas(match, previous_result, -1), result_deltas(match, result))
+        matches_delta = (result in FINISHED_RESULTS) - (previous_result in FINISHED_RESULTS)
+        # Matches stored before seasons were stamped get their season from their timestamp
+        season_id = match["season_id"] if "season_id" in match else season_id_at(seasons, match.get("timestamp"))
+
+        transaction.update(match_ref, {"result": result, "finished": result in FINISHED_RESULTS, "season_id": season_id,
+                                       "players": match_players(match)})
+        for season, mode in aggregate_keys(season_id, match.get("mode")):
+            transaction.set(db.collection("stats").document(aggregate_id(season, mode)), {
+                "season": season,
+                "mode": mode,
+                "matches": firestore.Increment(matches_delta),
+                "players": {
+                    player_id: {counter: firestore.Increment(value) for counter, value in counters.items()}
+                    for player_id, counters in deltas.items()
+                },
+            }, merge=True)
+        for player_id, entry in index_entries({**match, "result": result}).items():
+            transaction.set(db.collection("player_index").document(index_shard_id(player_id, season_id)),
+                            {"player_id": player_id, "season_id": season_id, "matches": {match_id: entry}}, merge=True)
+
+        return season_id, match.get("mode"), deltas, matches_delta
+
+    recorded = await record_result(db.transaction())
+    if recorded is None:
+        return
+
+    season_id, mode, deltas, matches_delta = recorded
+    # Patched before awaiting again, so no aggregate read after the commit is cached in between
+    patch_player_stats(repo_cache, season_id, mode, deltas, matches_delta)
+    match = await match_ref.get()
+    patch_player_history(repo_cache, match)
+    patch_player_index(repo_cache, match)
 
-    await get_finished_matches.cache.clear()
-    await get_matches_by_player.cache.clear()
+    season = await get_season_by_id(season_id)
+    if season_closed(season):
+        await freeze_season_leaderboards(season)
 
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}:{args[1]}")
-async def get_finished_matches(mode, season):
+def season_id_of(season):
+    return season.get("id") if season is not None else None
+
+
+@repo_cache.cached(tags=["stats"], key=lambda mode, season: player_stats_key(mode, season_id_of(season)))
+async def get_player_stats(mode, season):
     """
-    Retrieve all finished matches with optional filtering by mode.
+    Get the stats aggregate of a mode (0 for all modes) in a season (None for all seasons).
     """
-    query = db.collection("matches").where(filter=FieldFilter("result", "!=", 'UNFINISHED'))
+    await ensure_stats_aggregates()
+    season_id = season_id_of(season)
+    aggregate = await db.collection("stats").document(aggregate_id(season_id, mode)).get()
+    return aggregate.to_dict() if aggregate.exists else empty_aggregate(season_id, mode)
 
-    # Only add season filters if season is not None
-    if season is not None:
-        query = query.where(filter=FieldFilter("timestamp", ">=", season.get("start")))
-        query = query.where(filter=FieldFilter("timestamp", "<=", season.get("end")))
 
-    if mode:
-        query = query.where(filter=FieldFilter("mode", "==", mode))
-    return list(query.stream())
+async def ensure_stats_aggregates():
+    """
+    Build the stats aggregates from the matches if they never were, as on the first start after they were
+    introduced. Checked once per process, concurrent readers wait for the same build.
+    """
+    global stats_aggregates_ready
+    if stats_aggregates_ready is None:
+        stats_aggregates_ready = asyncio.ensure_future(build_missing_stats_aggregates())
+    try:
+        await asyncio.shield(stats_aggregates_ready)
+    except Exception:
+        # Check again on the next read
+        stats_aggregates_ready = None
+        raise
 
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}:{args[1]}")
-async def get_matches_by_player(player_id, limit):
+async def build_missing_stats_aggregates():
+    if (await db.collection("stats").document(STATS_META).get()).exists:
+        return
+    logger.warning("The stats aggregates were never built, building them from the matches")
+    matches = await rebuild_stats_aggregates()
+    logger.info(f"Built the stats aggregates from {matches} matches")
+
+
+async def get_season_leaderboard(mode, season):
     """
-    Retrieve the last N matches of the specified player.
+    Leaderboard of a mode in a season (None for all seasons). Closed seasons are served from their frozen snapshot.
+    """
+    if season_closed(season):
+        snapshot = await read_leaderboard(mode, season.get("id"))
+        if snapshot is not None:
+            return snapshot
+    return leaderboard(await get_player_stats(mode, season))
+
+
+@repo_cache.cached(tags=["leaderboards"])
+async def read_leaderboard(mode, season_id):
+    snapshot = await db.collection("leaderboards").document(aggregate_id(season_id, mode)).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+async def freeze_season_leaderboards(season):
+    """
+    Store the leaderboard of every mode of a season as a snapshot, replacing the previous ones.
+    Returns the number of snapshots stored.
+    """
+    query = db.collection("stats").where(filter=FieldFilter("season", "==", season.get("id")))
+    snapshots = [leaderboard(aggregate.to_dict()) async for aggregate in query.stream()]
+
+    batch = db.batch()
+    for snapshot in snapshots:
+        batch.set(db.collection("leaderboards").document(aggregate_id(snapshot["season"], snapshot["mode"])), snapshot)
+    await batch.commit()
+
+    repo_cache.invalidate("leaderboards")
+    return len(snapshots)
+
+
+async def backfill_match_stamps():
+    """
+    Stamp the season id, finished flag and players on every match missing them or stamped with stale values.
+    Returns the number of matches updated.
+    """
+    seasons = [(season.get("id"), season.get("start")) for season in await get_seasons()]
+    query = db.collection("matches").select(["timestamp", "result", "season_id", "finished", "players",
+                                             "blue_team.players", "red_team.players"])
+
+    updates = []
+    async for match in query.stream():
+        data = match.to_dict()
+        stamps = match_stamps(data, seasons)
+        if any(data.get(field) != value for field, value in stamps.items()):
+            updates.append((match.reference, stamps))
+
+    for start in range(0, len(updates), 500):
+        batch = db.batch()
+        for match_ref, stamps in updates[start:start + 500]:
+            batch.update(match_ref, stamps)
+        await batch.commit()
+
+    repo_cache.invalidate("matches")
+    return len(updates)
+
+
+async def rebuild_stats_aggregates():
+    """
+    Recompute every stats aggregate from the finished matches, counted in the season they are stamped with like
+    the incremental updates of set_match_victory. Returns the number of matches counted.
+    """
+    query = db.collection("matches").where(filter=FieldFilter("finished", "==", True))
+    matches = [match.to_dict() async for match in query.stream()]
+
+    aggregates = build_aggregates(matches, lambda match: match["season_id"])
+    stale = [aggregate.id async for aggregate in db.collection("stats").stream()
+             if aggregate.id not in aggregates and aggregate.id != STATS_META]
+
+    writes = list(aggregates.items()) + [(doc_id, None) for doc_id in stale]
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        for doc_id, aggregate in writes[start:start + 500]:
+            if aggregate is None:
+                batch.delete(db.collection("stats").document(doc_id))
+            else:
+                batch.set(db.collection("stats").document(doc_id), aggregate)
+        await batch.commit()
+    await db.collection("stats").document(STATS_META).set({"built_at": firestore.SERVER_TIMESTAMP})
+
+    repo_cache.invalidate("stats")
+    return len(matches)
+
+
+async def get_match_history(player_id, limit, cursor=None):
+    """
+    Page of the finished matches of a player, newest first, as history entries. Returns the page and
+    the cursor of the next one (None on the last page). Pages within the most recent matches are
+    sliced from a single cached entry per player.
+    """
+    page = history_page(await get_recent_history(player_id), limit, cursor)
+    if page is not None:
+        return page
+    return page_of(await query_match_history(player_id, limit + 1, cursor), limit)
+
+
+@repo_cache.cached(tags=lambda player_id: ["matches", player_matches_tag(player_id)], key=player_history_key)
+async def get_recent_history(player_id):
+    """
+    The most recent history entries of a player.
+    """
+    return recent_history(await query_match_history(player_id, HISTORY_CACHE_SIZE + 1))
+
+
+async def query_match_history(player_id, limit, cursor=None):
+    """
+    Read history entries of a player, only fetching the fields they are built from.
     """
     query = (
         db.collection("matches")
-        .where(filter=FieldFilter("result", "!=", "UNFINISHED"))
-        .where(
-            filter=Or(
-                [
-                    FieldFilter("blue_team.players", "array_contains", player_id),
-                    FieldFilter("red_team.players", "array_contains", player_id),
-                ]
-            )
-        )
+        .where(filter=FieldFilter("finished", "==", True))
+        .where(filter=FieldFilter("players", "array_contains", player_id))
         .order_by("timestamp", direction=firestore.Query.DESCENDING)
-        .limit(limit)
+        .select(HISTORY_FIELDS)
     )
+    if cursor is not None:
+        query = query.start_after({"timestamp": cursor})
 
-    return list(query.stream())
+    return [history_entry(match.id, match.to_dict(), player_id) async for match in query.limit(limit).stream()]
+
+
+async def get_player_profile(player_id):
+    """
+    Streaks, per-mode breakdown and record with and against every other player, read from the player's index.
+    """
+    return player_profile((await get_player_index(player_id)).values())
+
+
+@repo_cache.cached(tags=lambda player_id: ["matches", player_matches_tag(player_id)], key=player_index_key)
+async def get_player_index(player_id):
+    """
+    Index entries of the matches of a player, by match id, merged from the player's season shards.
+    """
+    query = db.collection("player_index").where(filter=FieldFilter("player_id", "==", player_id))
+    index = {}
+    async for shard in query.stream():
+        index.update(shard.get("matches"))
+    return index
+
+
+async def rebuild_player_index():
+    """
+    Recompute the index of every player from the raw matches, which must carry their season stamp.
+    Returns the number of players indexed.
+    """
+    query = db.collection("matches").select(INDEX_FIELDS)
+    index = build_player_index([(match.id, match.to_dict()) async for match in query.stream()])
+    shards = {index_shard_id(player_id, season_id): {"player_id": player_id, "season_id": season_id, "matches": matches}
+              for (player_id, season_id), matches in index.items()}
+    stale = [doc async for doc in db.collection("player_index").select(["player_id"]).stream() if doc.id not in shards]
+
+    writes = list(shards.items()) + [(doc.id, None) for doc in stale]
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        for doc_id, shard in writes[start:start + 500]:
+            if shard is None:
+                batch.delete(db.collection("player_index").document(doc_id))
+            else:
+                batch.set(db.collection("player_index").document(doc_id), shard)
+        await batch.commit()
+
+    players = {player_id for player_id, _ in index}
+    # Shards from before the index was split per season are named after the player alone
+    stale_players = {doc.get("player_id") if "player_id" in doc.to_dict() else doc.id for doc in stale}
+    repo_cache.invalidate(*[player_matches_tag(player_id) for player_id in players | stale_players])
+    return len(players)
 
 
 # Configuration Management
@@ -220,21 +548,31 @@ async def set_config(config, value):
     """
     Set a configuration in the database.
     """
-    db.collection("matches_settings").document("config").set({config: value})
-
-    await get_config.cache.clear()
+    await write_settings({"config": lambda config_doc: deep_merge(config_doc, {config: value})},
+                         db.collection("matches_settings").document("config").set({config: value}, merge=True),
+                         "config")
 
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}")
 async def get_config(config):
     """
     Get a specific configuration value.
     """
-    return db.collection("matches_settings").document("config").get().get(config)
+    if settings_mirror.ready:
+        return settings_mirror.get("config").get(config)
+    return await read_config(config)
+
+
+@repo_cache.cached(tags=["config"])
+async def read_config(config):
+    """
+    Read a configuration value, used until the settings mirror is loaded.
+    """
+    config_doc = await db.collection("matches_settings").document("config").get()
+    return (config_doc.to_dict() or {}).get(config)
 
 
 # Season Management
-@cached(ttl=7200)
+@repo_cache.cached(tags=["seasons"])
 async def get_last_season():
     """
     Get last season.
@@ -245,10 +583,19 @@ async def get_last_season():
         .limit(1)
     )
 
-    return list(query.stream())[0]
+    return [season async for season in query.stream()][0]
+
 
+@repo_cache.cached(tags=["seasons"])
+async def get_seasons():
+    """
+    Get every season, ordered by id.
+    """
+    query = db.collection("seasons").order_by("id")
+    return [season async for season in query.stream()]
 
-@cached(ttl=7200, key_builder=lambda f, *args, **kwargs: f"{f.__name__}:{args[0]}")
+
+@repo_cache.cached(tags=["seasons"])
 async def get_season_by_id(season_id: int):
     """
     Get season by the specified id.
@@ -259,27 +606,36 @@ async def get_season_by_id(season_id: int):
         .limit(1)
     )
 
-    result = list(query.stream())
+    result = [season async for season in query.stream()]
 
     return result[0] if result else None
 
 
 async def create_new_season():
     """
-    Create a new season.
+    Create a new season, ending the last one in the same transaction, and freeze the leaderboards of the
+    season that ended.
     """
-    last_season = await get_last_season()
-    new_season = {
-        "id": last_season.get("id") + 1,
-        "start": firestore.SERVER_TIMESTAMP,
-        "end": last_season.get("end")
-    }
+    seasons_ref = db.collection("seasons")
+    new_season_ref = seasons_ref.document()
+
+    @firestore.async_transactional
+    async def start_season(transaction):
+        query = seasons_ref.order_by("id", direction=firestore.Query.DESCENDING).limit(1)
+        last_season = [season async for season in query.stream(transaction=transaction)][0]
+
+        transaction.update(last_season.reference, {"end": firestore.SERVER_TIMESTAMP})
+        transaction.create(new_season_ref, {
+            "id": last_season.get("id") + 1,
+            "start": firestore.SERVER_TIMESTAMP,
+            "end": last_season.get("end")
+        })
+        return last_season
 
-    db.collection("seasons").document(last_season.id).update({"end": firestore.SERVER_TIMESTAMP})
-    result = db.collection("seasons").add(new_season)
+    last_season = await start_season(db.transaction())
 
-    await get_last_season.cache.clear()
-    await get_season_by_id.cache.clear()
+    repo_cache.invalidate("seasons")
+    await freeze_season_leaderboards(last_season)
 
-    return result[1].get()
+    return await new_season_ref.get()
 
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import aiohttp
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("http_client")
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 10))
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 15))
+RETRIES = 3
+BACKOFF = 0.5
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: Mapping
+    content: bytes
+
+
+class HttpError(Exception):
+    def __init__(self, url, status):
+        super().__init__(f"Request to {url} failed with status {status}")
+        self.url = url
+        self.status = status
+
+
+class HttpClient:
+    """
+    Pooled async HTTP client with keep-alive, bounded concurrency, timeouts and
+    retries with exponential backoff on 5xx and connection errors.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {"requests": 0, "connections": 0, "retries": 0}
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_created)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace],
+            )
+        return self._session
+
+    async def _on_connection_created(self, session, context, params):
+        self.stats["connections"] += 1
+
+    async def get(self, url, headers=None, accept=(200,)):
+        """
+        GET an url, retrying transient failures. Raises HttpError for any status not in `accept`.
+        """
+        session = self._get_session()
+
+        for attempt in range(self.retries + 1):
+            self.stats["requests"] += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    content = await response.read()
+                    if response.status < 500:
+                        if response.status not in accept:
+                            raise HttpError(url, response.status)
+                        return HttpResponse(response.status, response.headers.copy(), content)
+                    error = HttpError(url, response.status)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise error
+
+            self.stats["retries"] += 1
+            delay = self.backoff * 2 ** attempt
+            logger.warning(f"Retrying {url} in {delay:.1f}s, cause: {error!r}")
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url):
+        response = await self.get(url)
+        return json.loads(response.content)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
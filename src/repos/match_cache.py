@@ -0,0 +1,66 @@
+"""
+Write-through updates of the repository cache for a recorded match result.
+"""
+import copy
+
+from repos.match_history import add_to_recent_history, history_entry
+from repos.player_index import index_entry
+from repos.stats_aggregates import aggregate_keys, apply_deltas
+
+
+def player_history_key(player_id):
+    return f"get_recent_history:{player_id}"
+
+
+def player_index_key(player_id):
+    return f"get_player_index:{player_id}"
+
+
+def player_stats_key(mode, season_id):
+    return f"get_player_stats:{mode}:{season_id}"
+
+
+def player_matches_tag(player_id):
+    return f"matches:player:{player_id}"
+
+
+def match_players(match):
+    return match.get("blue_team")["players"] + match.get("red_team")["players"]
+
+
+def patch_player_history(cache, match):
+    """
+    Add a newly finished match to the cached recent histories of the players in it.
+    """
+    data = match.to_dict()
+    for player_id in match_players(match):
+        key = player_history_key(player_id)
+        cache.discard_load(key)
+        recent = cache.get(key)
+        if recent is not None:
+            cache.set(key, add_to_recent_history(recent, history_entry(match.id, data, player_id)))
+
+
+def patch_player_index(cache, match):
+    """
+    Record a newly finished match in the cached indexes of the players in it.
+    """
+    data = match.to_dict()
+    for player_id in match_players(match):
+        key = player_index_key(player_id)
+        cache.discard_load(key)
+        index = cache.get(key)
+        if index is not None:
+            cache.set(key, {**index, match.id: index_entry(data, player_id)})
+
+
+def patch_player_stats(cache, season_id, mode, deltas, matches_delta):
+    """
+    Apply the counter changes of a recorded result to the cached stats aggregates.
+    """
+    for season, aggregate_mode in aggregate_keys(season_id, mode):
+        key = player_stats_key(aggregate_mode, season)
+        cache.discard_load(key)
+        aggregate = cache.get(key)
+        if aggregate is not None:
+            cache.set(key, apply_deltas(copy.deepcopy(aggregate), deltas, matches_delta))
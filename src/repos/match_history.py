@@ -0,0 +1,61 @@
+"""
+Projected, paginated match histories, newest first.
+"""
+HISTORY_CACHE_SIZE = 50
+
+# The fields of a match a history entry is built from
+HISTORY_FIELDS = ["timestamp", "mode", "result", "blue_team.players"]
+
+
+def history_entry(match_id, match, player_id):
+    """
+    Entry of a match dict (at least HISTORY_FIELDS) in the history of a player: {"id", "timestamp", "mode", "won"}.
+    """
+    on_blue = player_id in match["blue_team"]["players"]
+    return {"id": match_id, "timestamp": match["timestamp"], "mode": match["mode"],
+            "won": on_blue == (match["result"] == "BLUE")}
+
+
+def recent_history(entries):
+    """
+    Cache value of the most recent entries of a player, given up to HISTORY_CACHE_SIZE + 1 of them.
+    """
+    return {"entries": entries[:HISTORY_CACHE_SIZE], "complete": len(entries) <= HISTORY_CACHE_SIZE}
+
+
+def add_to_recent_history(recent, entry):
+    """
+    Recent history with a newly finished match added, keeping it sorted and trimmed.
+    """
+    entries = [e for e in recent["entries"] if e["id"] != entry["id"]]
+    if not recent["complete"] and entries and entry["timestamp"] < entries[-1]["timestamp"]:
+        # Older than the cached window, it belongs to pages that are read from the database
+        return recent
+
+    entries.append(entry)
+    entries.sort(key=lambda e: e["timestamp"], reverse=True)
+    return {"entries": entries[:HISTORY_CACHE_SIZE],
+            "complete": recent["complete"] and len(entries) <= HISTORY_CACHE_SIZE}
+
+
+def history_page(recent, limit, cursor=None):
+    """
+    (page, next cursor) sliced from a recent history, or None if the page reaches past it.
+    The next cursor is the timestamp of the last entry of the page, None on the last page.
+    """
+    entries = recent["entries"]
+    start = 0 if cursor is None else sum(1 for entry in entries if entry["timestamp"] >= cursor)
+    end = start + limit
+    if end > len(entries) and not recent["complete"]:
+        return None
+
+    page = entries[start:end]
+    has_more = end < len(entries) or not recent["complete"]
+    return page, (page[-1]["timestamp"] if has_more and page else None)
+
+
+def page_of(entries, limit):
+    """
+    (page, next cursor) of up to limit + 1 entries read after a cursor.
+    """
+    return entries[:limit], (entries[limit - 1]["timestamp"] if len(entries) > limit else None)
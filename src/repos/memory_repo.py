@@ -0,0 +1,273 @@
+"""
+In-memory storage backend for tests and benchmarks, nothing is persisted.
+"""
+import copy
+from datetime import datetime, timezone
+
+from repos.document import Document, new_id
+from repos.match_history import history_entry, page_of
+from repos.player_index import index_entry, player_profile
+from repos.settings_mirror import deep_merge
+from repos.stats_aggregates import (FINISHED_RESULTS, aggregate_id, aggregate_keys, apply_deltas, build_aggregates,
+                                    empty_aggregate, leaderboard, match_players, match_stamps, merge_deltas,
+                                    result_deltas, season_closed)
+
+FIRST_SEASON_START = datetime(2000, 1, 1, tzinfo=timezone.utc)
+LAST_SEASON_END = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+class MemoryState:
+    def __init__(self):
+        self.players = {}
+        self.players_by_discord_id = {}
+        self.matches = {}
+        # player id -> ids of the player's matches, in timestamp order
+        self.player_matches = {}
+        self.stats = {}
+        self.leaderboards = {}
+        self.settings = {"pool": {"list": []}, "teams": {"A": [], "B": []}, "config": {}}
+        self.seasons = {new_id(): {"id": 1, "start": FIRST_SEASON_START, "end": LAST_SEASON_END}}
+
+
+state = MemoryState()
+
+
+def reset():
+    """
+    Drop every document, leaving a single open season.
+    """
+    global state
+    state = MemoryState()
+
+
+def load_dataset(players=(), matches=(), seasons=None):
+    """
+    Replace the store contents with raw documents: players as {"nome", "discord_id"}, matches as stored by
+    store_match (player ids, timestamp, mode and result, stamped with their season if not already) and seasons
+    as {"id", "start", "end"}.
+    Documents may carry their id in an "_id" key. Returns the ids of the players and of the matches.
+    """
+    reset()
+    if seasons is not None:
+        state.seasons = {season.pop("_id", None) or new_id(): season for season in map(dict, seasons)}
+
+    player_ids = []
+    for player in map(dict, players):
+        player_id = player.pop("_id", None) or new_id()
+        state.players[player_id] = player
+        state.players_by_discord_id[player["discord_id"]] = player_id
+        player_ids.append(player_id)
+
+    match_ids = []
+    for match in sorted(map(dict, matches), key=lambda m: m["timestamp"]):
+        match = {**match_stamps(match, season_bounds()), **match}
+        match_ids.append(insert_match(match.pop("_id", None) or new_id(), match))
+
+    state.stats = build_aggregates(state.matches.values(), lambda m: m["season_id"])
+    return player_ids, match_ids
+
+
+def insert_match(match_id, match):
+    state.matches[match_id] = match
+    for player_id in match["blue_team"]["players"] + match["red_team"]["players"]:
+        state.player_matches.setdefault(player_id, []).append(match_id)
+    return match_id
+
+
+def season_bounds():
+    return [(season["id"], season["start"]) for season in state.seasons.values()]
+
+
+def start_listeners():
+    """
+    Nothing to listen to, the store is always current.
+    """
+
+
+# Players Management
+async def set_player(name, user):
+    player_id = new_id()
+    state.players[player_id] = {"nome": name, "discord_id": user.id}
+    state.players_by_discord_id[user.id] = player_id
+
+
+async def get_players():
+    return [Document(player_id, state.players[player_id]) for player_id in sorted(state.players)]
+
+
+async def get_player_by_id(player_id):
+    player = state.players.get(player_id)
+    return Document(player_id, player) if player is not None else None
+
+
+async def get_player_by_discord_id(player_id):
+    doc_id = state.players_by_discord_id.get(player_id)
+    return Document(doc_id, state.players[doc_id]) if doc_id is not None else None
+
+
+async def get_players_by_id(ids):
+    return [Document(player_id, state.players[player_id]) for player_id in ids if player_id in state.players]
+
+
+async def get_players_by_discord_id(discord_ids):
+    return [player for player in [await get_player_by_discord_id(_id) for _id in discord_ids] if player is not None]
+
+
+# Active Players Management
+async def add_active_players(players):
+    pool = state.settings["pool"]["list"]
+    for player in await get_players_by_discord_id(players):
+        if player.id not in pool:
+            pool.append(player.id)
+
+
+async def remove_active_player(player_id):
+    state.settings["pool"]["list"] = [_id for _id in state.settings["pool"]["list"] if _id != player_id]
+
+
+async def clear_active_players():
+    state.settings["pool"] = {"list": []}
+    state.settings["teams"] = {"A": [], "B": []}
+    state.settings["config"]["fixed_teams"] = False
+
+
+async def get_active_players():
+    if state.settings["config"].get("fixed_teams"):
+        teams = state.settings["teams"]
+        return {"A": await get_players_by_id(teams.get("A", [])), "B": await get_players_by_id(teams.get("B", []))}
+    return await get_players_by_id(state.settings["pool"]["list"])
+
+
+# Fixed Teams Management
+async def add_fixed_players(players, team):
+    state.settings["teams"][team] = [p.id for p in await get_players_by_discord_id([player.id for player in players])]
+
+
+# Match Management
+async def store_match(match):
+    match = copy.deepcopy(match)
+    match["timestamp"] = datetime.now(timezone.utc)
+    match["season_id"] = (await get_last_season()).get("id")
+    match["result"] = "UNFINISHED"
+    match["finished"] = False
+    match["mode"] = len(match["red_team"]["players"])
+    match["blue_team"]["players"] = [player.id for player in match["blue_team"]["players"]]
+    match["red_team"]["players"] = [player.id for player in match["red_team"]["players"]]
+    match["players"] = match_players(match)
+    return insert_match(new_id(), match)
+
+
+async def set_match_victory(match_id, result):
+    match = state.matches[match_id]
+    previous_result = match.get("result")
+    if previous_result == result:
+        return
+
+    deltas = merge_deltas(result_deltas(match, previous_result, -1), result_deltas(match, result))
+    matches_delta = (result in FINISHED_RESULTS) - (previous_result in FINISHED_RESULTS)
+    season_id = match["season_id"]
+
+    match["result"] = result
+    match["finished"] = result in FINISHED_RESULTS
+    for season, mode in aggregate_keys(season_id, match.get("mode")):
+        aggregate = state.stats.setdefault(aggregate_id(season, mode), empty_aggregate(season, mode))
+        apply_deltas(aggregate, deltas, matches_delta)
+
+    season = await get_season_by_id(season_id)
+    if season_closed(season):
+        await freeze_season_leaderboards(season)
+
+
+async def get_player_stats(mode, season):
+    season_id = season.get("id") if season is not None else None
+    aggregate = state.stats.get(aggregate_id(season_id, mode))
+    return copy.deepcopy(aggregate) if aggregate is not None else empty_aggregate(season_id, mode)
+
+
+async def get_season_leaderboard(mode, season):
+    if season_closed(season):
+        snapshot = state.leaderboards.get(aggregate_id(season.get("id"), mode))
+        if snapshot is not None:
+            return copy.deepcopy(snapshot)
+    return leaderboard(await get_player_stats(mode, season))
+
+
+async def freeze_season_leaderboards(season):
+    snapshots = [leaderboard(copy.deepcopy(aggregate)) for aggregate in state.stats.values()
+                 if aggregate["season"] == season.get("id")]
+    for snapshot in snapshots:
+        state.leaderboards[aggregate_id(snapshot["season"], snapshot["mode"])] = snapshot
+    return len(snapshots)
+
+
+async def backfill_match_stamps():
+    updated = 0
+    for match in state.matches.values():
+        stamps = match_stamps(match, season_bounds())
+        if any(match.get(field) != value for field, value in stamps.items()):
+            match.update(stamps)
+            updated += 1
+    return updated
+
+
+async def rebuild_stats_aggregates():
+    finished = [match for match in state.matches.values() if match.get("finished")]
+    state.stats = build_aggregates(finished, lambda m: m["season_id"])
+    return len(finished)
+
+
+async def get_match_history(player_id, limit, cursor=None):
+    entries = []
+    for match_id in reversed(state.player_matches.get(player_id, [])):
+        if len(entries) > limit:
+            break
+        match = state.matches[match_id]
+        if match.get("finished") and (cursor is None or match["timestamp"] < cursor):
+            entries.append(history_entry(match_id, match, player_id))
+    return page_of(entries, limit)
+
+
+async def get_player_profile(player_id):
+    return player_profile(index_entry(state.matches[match_id], player_id)
+                          for match_id in state.player_matches.get(player_id, []))
+
+
+async def rebuild_player_index():
+    state.player_matches = {}
+    for match_id, match in sorted(state.matches.items(), key=lambda item: item[1]["timestamp"]):
+        for player_id in match["blue_team"]["players"] + match["red_team"]["players"]:
+            state.player_matches.setdefault(player_id, []).append(match_id)
+    return len(state.player_matches)
+
+
+# Configuration Management
+async def set_config(config, value):
+    deep_merge(state.settings["config"], {config: value})
+
+
+async def get_config(config):
+    return copy.deepcopy(state.settings["config"].get(config))
+
+
+# Season Management
+async def get_last_season():
+    return max(await get_seasons(), key=lambda season: season.get("id"))
+
+
+async def get_seasons():
+    return sorted([Document(doc_id, season) for doc_id, season in state.seasons.items()],
+                  key=lambda season: season.get("id"))
+
+
+async def get_season_by_id(season_id: int):
+    return next((season for season in await get_seasons() if season.get("id") == season_id), None)
+
+
+async def create_new_season():
+    last_season = await get_last_season()
+    now = datetime.now(timezone.utc)
+    new_season_id = new_id()
+    state.seasons[new_season_id] = {"id": last_season.get("id") + 1, "start": now, "end": last_season.get("end")}
+    state.seasons[last_season.id]["end"] = now
+    await freeze_season_leaderboards(last_season)
+    return Document(new_season_id, state.seasons[new_season_id])
@@ -0,0 +1,35 @@
+from repos.snapshot_mirror import SnapshotMirror
+
+
+class PlayerDirectory(SnapshotMirror):
+    """
+    In-memory copy of the players collection, indexed by document id and by discord id.
+    """
+
+    def __init__(self, on_change=None):
+        super().__init__(on_change)
+        self.by_id = {}
+        self.by_discord_id = {}
+
+    def get(self, player_id):
+        return self.by_id.get(player_id)
+
+    def get_by_discord_id(self, discord_id):
+        return self.by_discord_id.get(discord_id)
+
+    def all(self):
+        return [self.by_id[player_id] for player_id in sorted(self.by_id)]
+
+    def put(self, player):
+        self.drop(player)
+        self.by_id[player.id] = player
+        self.by_discord_id[player.get("discord_id")] = player
+
+    def drop(self, player):
+        previous = self.by_id.pop(player.id, None)
+        if previous is not None:
+            self.by_discord_id.pop(previous.get("discord_id"), None)
+
+    def clear(self):
+        self.by_id = {}
+        self.by_discord_id = {}
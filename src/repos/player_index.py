@@ -0,0 +1,85 @@
+"""
+Pure helpers for the player -> match index and the profiles built from it.
+"""
+from repos.stats_aggregates import FINISHED_RESULTS
+
+# The fields of a match an index entry is built from
+INDEX_FIELDS = ["timestamp", "mode", "result", "season_id", "blue_team.players", "red_team.players"]
+
+
+def index_shard_id(player_id, season_id):
+    """
+    Id of the shard holding the index entries of a player in a season.
+    """
+    return f"{player_id}_{season_id}"
+
+
+def index_entry(match, player_id):
+    """
+    Index entry of a match dict in the index of one of its players: {"timestamp", "mode", "team", "result",
+    "allies", "opponents"}.
+    """
+    blue = match["blue_team"]["players"]
+    red = match["red_team"]["players"]
+    team, allies, opponents = ("BLUE", blue, red) if player_id in blue else ("RED", red, blue)
+    return {"timestamp": match["timestamp"], "mode": match.get("mode"), "team": team, "result": match.get("result"),
+            "allies": [_id for _id in allies if _id != player_id], "opponents": list(opponents)}
+
+
+def index_entries(match):
+    """
+    Index entry of a match dict for each of its players.
+    """
+    return {player_id: index_entry(match, player_id)
+            for player_id in match["blue_team"]["players"] + match["red_team"]["players"]}
+
+
+def build_player_index(matches):
+    """
+    Recompute the index of every player from (match id, match dict) pairs, skipping unfinished matches.
+    Returns the entries of each (player id, season id) shard.
+    """
+    index = {}
+    for match_id, match in matches:
+        if match.get("result") not in FINISHED_RESULTS:
+            continue
+        for player_id, entry in index_entries(match).items():
+            index.setdefault((player_id, match.get("season_id")), {})[match_id] = entry
+    return index
+
+
+def empty_record():
+    return {"wins": 0, "losses": 0, "games": 0}
+
+
+def count(record, won):
+    record["wins"] += won
+    record["losses"] += not won
+    record["games"] += 1
+
+
+def player_profile(entries):
+    """
+    Profile of a player from their index entries: overall, per-mode and per-player records plus streaks.
+    The current streak counts wins when positive and losses when negative.
+    """
+    profile = {"record": empty_record(), "modes": {}, "allies": {}, "opponents": {},
+               "current_streak": 0, "best_streak": 0}
+
+    finished = [entry for entry in entries if entry.get("result") in FINISHED_RESULTS]
+    for entry in sorted(finished, key=lambda e: e["timestamp"]):
+        won = entry["team"] == entry["result"]
+        count(profile["record"], won)
+        count(profile["modes"].setdefault(entry["mode"], empty_record()), won)
+        for player_id in entry["allies"]:
+            count(profile["allies"].setdefault(player_id, empty_record()), won)
+        for player_id in entry["opponents"]:
+            count(profile["opponents"].setdefault(player_id, empty_record()), won)
+
+        streak = profile["current_streak"]
+        if won:
+            profile["current_streak"] = streak + 1 if streak > 0 else 1
+        else:
+            profile["current_streak"] = streak - 1 if streak < 0 else -1
+        profile["best_streak"] = max(profile["best_streak"], profile["current_streak"])
+    return profile
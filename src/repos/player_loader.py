@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("player_loader")
+
+PLAYER_BATCH_SIZE = int(os.getenv("PLAYER_BATCH_SIZE", 100))
+
+
+class PlayerLoader:
+    """
+    Loads player documents by id. Every lookup made within one event loop tick is
+    coalesced into a single batch read, split in chunks of `batch_size`, and loaded
+    documents are kept in an identity map until `clear` is called.
+    `fetch_many(ids)` must return the existing documents among the given ids.
+    """
+
+    def __init__(self, fetch_many, batch_size=PLAYER_BATCH_SIZE):
+        self.fetch_many = fetch_many
+        self.batch_size = batch_size
+        self.identity = {}
+        self.stats = {"batches": 0, "fetched": 0, "hits": 0}
+        self._pending = {}
+        self._dispatch_scheduled = False
+        self._tasks = set()
+
+    async def load(self, player_id):
+        """
+        Player document with the given id, or None if it does not exist.
+        """
+        if player_id in self.identity:
+            self.stats["hits"] += 1
+            return self.identity[player_id]
+
+        future = self._pending.get(player_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[player_id] = loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        return await future
+
+    async def load_many(self, player_ids):
+        """
+        Existing player documents among the given ids, in the order of the ids.
+        """
+        players = await asyncio.gather(*[self.load(player_id) for player_id in player_ids])
+        return [player for player in players if player is not None]
+
+    def prime(self, players):
+        """
+        Add documents that were loaded some other way to the identity map.
+        """
+        self.identity.update({player.id: player for player in players})
+
+    def clear(self):
+        self.identity.clear()
+
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        pending, self._pending = self._pending, {}
+        ids = list(pending)
+        for start in range(0, len(ids), self.batch_size):
+            chunk = {player_id: pending[player_id] for player_id in ids[start:start + self.batch_size]}
+            task = asyncio.ensure_future(self._fetch(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, chunk):
+        self.stats["batches"] += 1
+        try:
+            players = {player.id: player for player in await self.fetch_many(list(chunk))}
+        except Exception as e:
+            logger.warning(f"Failed to load {len(chunk)} players, cause: {e}")
+            for future in chunk.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["fetched"] += len(players)
+        self.identity.update(players)
+        for player_id, future in chunk.items():
+            if not future.done():
+                future.set_result(players.get(player_id))
@@ -0,0 +1,58 @@
+import copy
+
+from repos.snapshot_mirror import SnapshotMirror
+
+
+def deep_merge(target, fields):
+    """
+    Merge `fields` into `target` the way Firestore's set(..., merge=True) does, nested maps included.
+    """
+    for key, value in fields.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            deep_merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+class SettingsMirror(SnapshotMirror):
+    """
+    In-memory copy of the matches_settings documents (pool, teams and config), as dicts.
+    Writes are applied locally right away and rolled back if they fail.
+    """
+
+    def __init__(self, on_change=None):
+        super().__init__(on_change)
+        self.documents = {}
+
+    def get(self, doc_id):
+        return self.documents.get(doc_id, {})
+
+    def put(self, document):
+        self.documents[document.id] = document.to_dict() or {}
+
+    def drop(self, document):
+        self.documents.pop(document.id, None)
+
+    def clear(self):
+        self.documents = {}
+
+    async def write(self, changes, write):
+        """
+        Apply `changes` ({doc id: change(document dict)}) to the mirrored documents, then await
+        `write`, restoring the previous documents if it fails.
+        """
+        previous = {doc_id: self.documents.get(doc_id) for doc_id in changes}
+        for doc_id, change in changes.items():
+            self.documents[doc_id] = change(copy.deepcopy(previous[doc_id] or {}))
+        try:
+            await write
+        except Exception:
+            for doc_id, document in previous.items():
+                if document is None:
+                    self.documents.pop(doc_id, None)
+                else:
+                    self.documents[doc_id] = document
+            raise
+        if self.on_change is not None:
+            self.on_change()
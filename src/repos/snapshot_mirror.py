@@ -0,0 +1,114 @@
+import abc
+import asyncio
+import logging
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("snapshot_mirror")
+
+# Seconds between checks that a listener is still streaming
+CHECK_INTERVAL = 30
+
+
+class SnapshotMirror(abc.ABC):
+    """
+    In-memory copy of the documents matched by a query, kept current by a snapshot listener.
+    Listener callbacks run on Firestore's watch thread and are handed over to the event loop
+    before any state is touched. Subclasses store documents in `put`, drop them in `drop` and
+    forget them all in `clear`.
+
+    A listener that stops streaming or delivers a snapshot that fails to apply is replaced by a
+    new one. Until its first snapshot arrives the mirror is not ready, so reads go to the database.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.ready = False
+        self._query = None
+        self._watch = None
+        self._loop = None
+        self._supervisor = None
+
+    def watch(self, query, loop=None):
+        """
+        Start listening to `query`. Does nothing if the mirror is already listening.
+        """
+        if self._watch is not None:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._query = query
+        self._watch = query.on_snapshot(self._on_snapshot)
+        self._supervisor = self._loop.create_task(self._supervise())
+
+    def close(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        self.ready = False
+
+    def apply(self, changes):
+        """
+        Apply document changes of a snapshot, as (change type name, document) pairs.
+        """
+        for change_type, document in changes:
+            if change_type == "REMOVED":
+                self.drop(document)
+            else:
+                self.put(document)
+
+        if not self.ready:
+            logger.info(f"{type(self).__name__} loaded")
+        self.ready = True
+        if changes and self.on_change is not None:
+            self.on_change()
+
+    def check(self):
+        """
+        Replace the listener if it stopped streaming. Returns True when it was replaced.
+        """
+        if self._watch is None or self._watch.is_active:
+            return False
+        self.resubscribe("stopped streaming")
+        return True
+
+    def resubscribe(self, reason):
+        """
+        Drop the mirrored documents and listen again, serving reads from the database until the new
+        listener delivers its first snapshot.
+        """
+        logger.warning(f"{type(self).__name__} listener {reason}, reading from the database until it reloads")
+        self._watch.unsubscribe()
+        self.ready = False
+        self.clear()
+        if self.on_change is not None:
+            self.on_change()
+        self._watch = self._query.on_snapshot(self._on_snapshot)
+
+    @abc.abstractmethod
+    def put(self, document):
+        pass
+
+    @abc.abstractmethod
+    def drop(self, document):
+        pass
+
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            self.check()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        changes = [(change.type.name, change.document) for change in changes]
+        self._loop.call_soon_threadsafe(self._apply_snapshot, changes)
+
+    def _apply_snapshot(self, changes):
+        try:
+            self.apply(changes)
+        except Exception as e:
+            self.resubscribe(f"delivered a snapshot that failed to apply, cause: {e}")
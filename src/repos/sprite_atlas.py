@@ -0,0 +1,84 @@
+import json
+import logging
+import mmap
+import os
+
+from PIL import Image
+from repos.asset_store import atomic_write
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("sprite_atlas")
+
+ATLAS_FILE = "atlas.rgba"
+INDEX_FILE = "atlas.json"
+USE_MMAP = os.getenv("CHAMPION_ATLAS_MMAP", "true").lower() == "true"
+
+
+class SpriteAtlas:
+    """
+    Every champion tile of a patch packed into one raw RGBA buffer, with an index
+    of byte offsets by champion id. Tiles are cropped out of the buffer without
+    any decoding, and the buffer can be memory-mapped so it lives in the page cache.
+    """
+
+    def __init__(self, buffer, offsets, tile_size):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.tile_size = tile_size
+        self.tile_bytes = tile_size * tile_size * 4
+
+    def __contains__(self, champion_name):
+        return champion_name in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def tile(self, champion_name):
+        """
+        Get a champion tile as an RGBA image backed by the atlas buffer.
+        """
+        offset = self.offsets[champion_name]
+        return Image.frombuffer(
+            "RGBA", (self.tile_size, self.tile_size),
+            self.buffer[offset:offset + self.tile_bytes], "raw", "RGBA", 0, 1
+        )
+
+    @classmethod
+    def build(cls, directory, tiles, tile_size):
+        """
+        Write the atlas of the given (champion id, RGBA tile) pairs to a version directory.
+        """
+        buffer = bytearray()
+        offsets = {}
+        for champion_name, tile in tiles:
+            offsets[champion_name] = len(buffer)
+            buffer += tile.tobytes()
+
+        atomic_write(os.path.join(directory, ATLAS_FILE), bytes(buffer))
+        atomic_write(
+            os.path.join(directory, INDEX_FILE),
+            json.dumps({"tile_size": tile_size, "offsets": offsets}).encode("utf-8")
+        )
+        return cls(memoryview(buffer), offsets, tile_size)
+
+    @classmethod
+    def open(cls, directory, use_mmap=USE_MMAP):
+        """
+        Open the atlas stored in a version directory, or return None if it was never built.
+        Raises ValueError if the stored files are corrupt or truncated.
+        """
+        try:
+            with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+                index = json.load(f)
+            with open(os.path.join(directory, ATLAS_FILE), "rb") as f:
+                if use_mmap:
+                    buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    buffer = memoryview(f.read())
+        except FileNotFoundError:
+            return None
+
+        atlas = cls(buffer, index["offsets"], index["tile_size"])
+        if any(offset + atlas.tile_bytes > len(buffer) for offset in atlas.offsets.values()):
+            raise ValueError(f"Truncated sprite atlas in {directory}")
+        return atlas
@@ -0,0 +1,621 @@
+"""
+SQLite storage backend for self-hosted deployments.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from repos.document import Document, new_id
+from repos.match_history import page_of
+from repos.player_index import index_entry, player_profile
+from repos.stats_aggregates import (ALL_SEASONS, FINISHED_RESULTS, aggregate_id, aggregate_keys, empty_aggregate,
+                                    leaderboard, merge_deltas, result_deltas, season_closed, season_id_at)
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("sqlite_repo")
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "perso.db")
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+LAST_SEASON_END = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    discord_id INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS seasons (
+    doc_id TEXT PRIMARY KEY,
+    id INTEGER NOT NULL UNIQUE,
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    season_id INTEGER,
+    mode INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    blue_players TEXT NOT NULL,
+    red_players TEXT NOT NULL,
+    blue_champions TEXT NOT NULL,
+    red_champions TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS match_players (
+    match_id TEXT NOT NULL REFERENCES matches (id),
+    player_id TEXT NOT NULL,
+    team TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (match_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS match_players_player_timestamp ON match_players (player_id, timestamp);
+CREATE INDEX IF NOT EXISTS matches_season_mode_result ON matches (season_id, mode, result);
+CREATE TABLE IF NOT EXISTS aggregates (
+    id TEXT PRIMARY KEY,
+    season_id INTEGER,
+    mode INTEGER NOT NULL,
+    matches INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregate_players (
+    aggregate_id TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (aggregate_id, player_id)
+);
+CREATE TABLE IF NOT EXISTS leaderboards (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+DEFAULT_SETTINGS = {"pool": {"list": []}, "teams": {"A": [], "B": []}, "config": {}}
+
+# Every statement runs on this thread, which owns the connection
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+_connection = None
+
+
+def connect(path):
+    """
+    Open a database, creating the schema and the first season if needed.
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    with conn:
+        for doc_id, data in DEFAULT_SETTINGS.items():
+            conn.execute("INSERT OR IGNORE INTO settings (id, data) VALUES (?, ?)", (doc_id, json.dumps(data)))
+        if conn.execute("SELECT COUNT(*) FROM seasons").fetchone()[0] == 0:
+            conn.execute('INSERT INTO seasons (doc_id, id, start, "end") VALUES (?, 1, ?, ?)',
+                         (new_id(), to_text(datetime.now(timezone.utc)), to_text(LAST_SEASON_END)))
+    return conn
+
+
+def connection():
+    global _connection
+    if _connection is None:
+        _connection = connect(SQLITE_PATH)
+        logger.info(f"Opened SQLite database {SQLITE_PATH}")
+    return _connection
+
+
+async def run(func, *args):
+    """
+    Run `func(connection, *args)` on the database thread.
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, lambda: func(connection(), *args))
+
+
+def to_text(timestamp):
+    return timestamp.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def from_text(text):
+    return datetime.fromisoformat(text)
+
+
+def player_document(row):
+    return Document(row["id"], {"nome": row["nome"], "discord_id": row["discord_id"]})
+
+
+def season_document(row):
+    return Document(row["doc_id"], {"id": row["id"], "start": from_text(row["start"]), "end": from_text(row["end"])})
+
+
+def match_documents(conn, match_ids):
+    """
+    Match documents, shaped like the Firestore ones, in the order of the ids.
+    """
+    matches = {}
+    for start in range(0, len(match_ids), 500):
+        chunk = match_ids[start:start + 500]
+        query = f"SELECT * FROM matches WHERE id IN ({', '.join('?' * len(chunk))})"
+        matches.update({row["id"]: match_document(row) for row in conn.execute(query, chunk)})
+    return [matches[match_id] for match_id in match_ids if match_id in matches]
+
+
+def match_document(row):
+    return Document(row["id"], {
+        "timestamp": from_text(row["timestamp"]), "season_id": row["season_id"], "mode": row["mode"],
+        "result": row["result"], "finished": row["result"] in FINISHED_RESULTS,
+        "blue_team": {"players": json.loads(row["blue_players"]), "champions": json.loads(row["blue_champions"])},
+        "red_team": {"players": json.loads(row["red_players"]), "champions": json.loads(row["red_champions"])},
+    })
+
+
+def insert_match(conn, match_id, match, season_id):
+    """
+    Insert a match document (player ids, timestamp, mode and result) and its participants.
+    The player lists are kept on the match row as well, so reading a match touches a single table.
+    """
+    timestamp = to_text(match["timestamp"])
+    conn.execute(
+        "INSERT INTO matches (id, timestamp, season_id, mode, result, blue_players, red_players, blue_champions, "
+        "red_champions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (match_id, timestamp, season_id, match["mode"], match["result"],
+         json.dumps(match["blue_team"]["players"]), json.dumps(match["red_team"]["players"]),
+         json.dumps(match["blue_team"].get("champions", [])), json.dumps(match["red_team"].get("champions", []))),
+    )
+    insert_participants(conn, match_id, match, timestamp)
+
+
+def insert_participants(conn, match_id, match, timestamp):
+    conn.executemany(
+        "INSERT INTO match_players (match_id, player_id, team, position, timestamp) VALUES (?, ?, ?, ?, ?)",
+        [(match_id, player_id, team.upper(), position, timestamp)
+         for team in ("blue", "red") for position, player_id in enumerate(match[f"{team}_team"]["players"])],
+    )
+
+
+def read_settings(conn, doc_id):
+    return json.loads(conn.execute("SELECT data FROM settings WHERE id = ?", (doc_id,)).fetchone()["data"])
+
+
+def write_settings(conn, doc_id, data):
+    conn.execute("INSERT OR REPLACE INTO settings (id, data) VALUES (?, ?)", (doc_id, json.dumps(data)))
+
+
+def start_listeners():
+    """
+    Nothing to listen to, every read goes to the local database.
+    """
+
+
+# Players Management
+async def set_player(name, user):
+    """
+    Add a new player.
+    """
+    def insert(conn):
+        with conn:
+            conn.execute("INSERT INTO players (id, nome, discord_id) VALUES (?, ?, ?)", (new_id(), name, user.id))
+
+    await run(insert)
+
+
+async def get_players():
+    """
+    Get all players.
+    """
+    return await run(lambda conn: [player_document(row) for row in conn.execute("SELECT * FROM players ORDER BY id")])
+
+
+async def get_player_by_id(player_id):
+    """
+    Get a single player by its ID, or None if it does not exist.
+    """
+    row = await run(lambda conn: conn.execute("SELECT * FROM players WHERE id = ?", (player_id,)).fetchone())
+    return player_document(row) if row else None
+
+
+async def get_player_by_discord_id(player_id):
+    """
+    Get a single player by its discord ID.
+    """
+    row = await run(lambda conn: conn.execute("SELECT * FROM players WHERE discord_id = ?", (player_id,)).fetchone())
+    return player_document(row) if row else None
+
+
+def select_players(conn, column, values):
+    rows = {}
+    for start in range(0, len(values), 500):
+        chunk = list(values[start:start + 500])
+        query = f"SELECT * FROM players WHERE {column} IN ({', '.join('?' * len(chunk))})"
+        rows.update({row[column]: row for row in conn.execute(query, chunk)})
+    return [player_document(rows[value]) for value in values if value in rows]
+
+
+async def get_players_by_id(ids):
+    """
+    Get players whose IDs are in the provided list, in the order of the list.
+    """
+    return await run(select_players, "id", list(ids))
+
+
+async def get_players_by_discord_id(discord_ids):
+    """
+    Get players whose Discord IDs are in the provided list.
+    """
+    return await run(select_players, "discord_id", list(discord_ids))
+
+
+# Active Players Management
+async def add_active_players(players):
+    """
+    Add players to the active pool.
+    """
+    def add(conn, discord_ids):
+        with conn:
+            pool = read_settings(conn, "pool")
+            for player in select_players(conn, "discord_id", discord_ids):
+                if player.id not in pool["list"]:
+                    pool["list"].append(player.id)
+            write_settings(conn, "pool", pool)
+
+    await run(add, list(players))
+
+
+async def remove_active_player(player_id):
+    """
+    Remove a player from the active pool.
+    """
+    def remove(conn):
+        with conn:
+            pool = read_settings(conn, "pool")
+            write_settings(conn, "pool", {**pool, "list": [_id for _id in pool["list"] if _id != player_id]})
+
+    await run(remove)
+
+
+async def clear_active_players():
+    """
+    Clear the active players list and reset configurations.
+    """
+    def clear(conn):
+        with conn:
+            write_settings(conn, "pool", {"list": []})
+            write_settings(conn, "teams", {"A": [], "B": []})
+            write_settings(conn, "config", {**read_settings(conn, "config"), "fixed_teams": False})
+
+    await run(clear)
+
+
+async def get_active_players():
+    """
+    Retrieve the list of active players or fixed teams if enabled.
+    """
+    def read(conn):
+        if read_settings(conn, "config").get("fixed_teams"):
+            teams = read_settings(conn, "teams")
+            return {"A": select_players(conn, "id", teams.get("A", [])),
+                    "B": select_players(conn, "id", teams.get("B", []))}
+        return select_players(conn, "id", read_settings(conn, "pool")["list"])
+
+    return await run(read)
+
+
+# Fixed Teams Management
+async def add_fixed_players(players, team):
+    """
+    Add players to a fixed team.
+    """
+    def add(conn, discord_ids):
+        with conn:
+            teams = read_settings(conn, "teams")
+            teams[team] = [player.id for player in select_players(conn, "discord_id", discord_ids)]
+            write_settings(conn, "teams", teams)
+
+    await run(add, [player.id for player in players])
+
+
+# Match Management
+async def store_match(match):
+    """
+    Store a match in the database.
+    """
+    stored = {
+        "timestamp": datetime.now(timezone.utc),
+        "result": "UNFINISHED",
+        "mode": len(match["red_team"]["players"]),
+        "blue_team": {**match["blue_team"], "players": [player.id for player in match["blue_team"]["players"]]},
+        "red_team": {**match["red_team"], "players": [player.id for player in match["red_team"]["players"]]},
+    }
+
+    def insert(conn, match_id):
+        with conn:
+            season_id = conn.execute("SELECT MAX(id) FROM seasons").fetchone()[0]
+            insert_match(conn, match_id, stored, season_id)
+        return match_id
+
+    return await run(insert, new_id())
+
+
+async def set_match_victory(match_id, result):
+    """
+    Set the result of a match, updating the stats aggregates it counts towards in the same transaction.
+    A result of a closed season also refreshes its frozen leaderboards.
+    """
+    def update(conn):
+        with conn:
+            match = match_documents(conn, [match_id])[0].to_dict()
+            previous_result = match["result"]
+            if previous_result == result:
+                return None
+
+            deltas = merge_deltas(result_deltas(match, previous_result, -1), result_deltas(match, result))
+            matches_delta = (result in FINISHED_RESULTS) - (previous_result in FINISHED_RESULTS)
+
+            conn.execute("UPDATE matches SET result = ? WHERE id = ?", (result, match_id))
+            for season, mode in aggregate_keys(match["season_id"], match["mode"]):
+                doc_id = aggregate_id(season, mode)
+                conn.execute(
+                    "INSERT INTO aggregates (id, season_id, mode, matches) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET matches = matches + excluded.matches",
+                    (doc_id, season, mode, matches_delta),
+                )
+                conn.executemany(
+                    "INSERT INTO aggregate_players (aggregate_id, player_id, wins, losses, games) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (aggregate_id, player_id) DO UPDATE SET wins = wins + excluded.wins, "
+                    "losses = losses + excluded.losses, games = games + excluded.games",
+                    [(doc_id, player_id, c["wins"], c["losses"], c["games"]) for player_id, c in deltas.items()],
+                )
+        return match["season_id"]
+
+    season_id = await run(update)
+    if season_id is None:
+        return
+    season = await get_season_by_id(season_id)
+    if season_closed(season):
+        await freeze_season_leaderboards(season)
+
+
+async def get_player_stats(mode, season):
+    """
+    Get the stats aggregate of a mode (0 for all modes) in a season (None for all seasons).
+    """
+    return await run(read_aggregate, season.get("id") if season is not None else None, mode)
+
+
+def read_aggregate(conn, season_id, mode):
+    doc_id = aggregate_id(season_id, mode)
+    stats = empty_aggregate(season_id, mode)
+    row = conn.execute("SELECT matches FROM aggregates WHERE id = ?", (doc_id,)).fetchone()
+    if row is not None:
+        stats["matches"] = row["matches"]
+    rows = conn.execute("SELECT * FROM aggregate_players WHERE aggregate_id = ?", (doc_id,))
+    stats["players"] = {row["player_id"]: {"wins": row["wins"], "losses": row["losses"], "games": row["games"]}
+                        for row in rows}
+    return stats
+
+
+async def get_season_leaderboard(mode, season):
+    """
+    Leaderboard of a mode in a season (None for all seasons). Closed seasons are served from their frozen snapshot.
+    """
+    if season_closed(season):
+        row = await run(lambda conn: conn.execute("SELECT data FROM leaderboards WHERE id = ?",
+                                                  (aggregate_id(season.get("id"), mode),)).fetchone())
+        if row is not None:
+            return json.loads(row["data"])
+    return leaderboard(await get_player_stats(mode, season))
+
+
+def freeze_leaderboards(conn, season_id):
+    modes = [row["mode"] for row in conn.execute("SELECT mode FROM aggregates WHERE season_id = ?", (season_id,))]
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO leaderboards (id, data) VALUES (?, ?)",
+            [(aggregate_id(season_id, mode), json.dumps(leaderboard(read_aggregate(conn, season_id, mode))))
+             for mode in modes],
+        )
+    return len(modes)
+
+
+async def freeze_season_leaderboards(season):
+    """
+    Store the leaderboard of every mode of a season as a snapshot, replacing the previous ones.
+    Returns the number of snapshots stored.
+    """
+    return await run(freeze_leaderboards, season.get("id"))
+
+
+def restamp_seasons(conn):
+    """
+    Restamp the season of every match from the season boundaries. Returns the number of matches restamped.
+    The finished flag of the other backends is the result column itself.
+    """
+    seasons = [(row["id"], from_text(row["start"])) for row in conn.execute("SELECT id, start FROM seasons")]
+    rows = conn.execute("SELECT id, timestamp, season_id FROM matches").fetchall()
+    updates = [(season_id, row["id"]) for row in rows
+               if (season_id := season_id_at(seasons, from_text(row["timestamp"]))) != row["season_id"]]
+    with conn:
+        conn.executemany("UPDATE matches SET season_id = ? WHERE id = ?", updates)
+    return len(updates)
+
+
+async def backfill_match_stamps():
+    """
+    Restamp the season of every match stamped with a stale one. Returns the number of matches updated.
+    """
+    return await run(restamp_seasons)
+
+
+def rebuild_aggregates(conn):
+    """
+    Restamp the season of every match from the season boundaries and recompute every stats aggregate.
+    Returns the number of finished matches.
+    """
+    restamp_seasons(conn)
+    finished = f"m.result IN ({', '.join('?' * len(FINISHED_RESULTS))})"
+
+    with conn:
+        conn.execute("DELETE FROM aggregate_players")
+        conn.execute("DELETE FROM aggregates")
+
+        # (aggregate id, season, mode, filter) of the four aggregates every match counts towards,
+        # with the same ids as aggregate_id()
+        scopes = [
+            ("m.season_id || '_' || m.mode", "m.season_id", "m.mode", "m.season_id IS NOT NULL"),
+            ("m.season_id || '_0'", "m.season_id", "0", "m.season_id IS NOT NULL"),
+            (f"'{ALL_SEASONS}_' || m.mode", "NULL", "m.mode", "1"),
+            (f"'{ALL_SEASONS}_0'", "NULL", "0", "1"),
+        ]
+        for doc_id, season, mode, scope in scopes:
+            conn.execute(
+                f"INSERT INTO aggregates (id, season_id, mode, matches) SELECT {doc_id}, {season}, {mode}, COUNT(*) "
+                f"FROM matches m WHERE {finished} AND {scope} GROUP BY 1",
+                FINISHED_RESULTS,
+            )
+            conn.execute(
+                "INSERT INTO aggregate_players (aggregate_id, player_id, wins, losses, games) "
+                f"SELECT {doc_id}, mp.player_id, SUM(mp.team = m.result), SUM(mp.team != m.result), COUNT(*) "
+                f"FROM matches m JOIN match_players mp ON mp.match_id = m.id WHERE {finished} AND {scope} GROUP BY 1, 2",
+                FINISHED_RESULTS,
+            )
+
+    return conn.execute(f"SELECT COUNT(*) FROM matches m WHERE {finished}", FINISHED_RESULTS).fetchone()[0]
+
+
+async def rebuild_stats_aggregates():
+    """
+    Recompute every stats aggregate from the raw finished matches. Returns the number of matches counted.
+    """
+    return await run(rebuild_aggregates)
+
+
+async def get_match_history(player_id, limit, cursor=None):
+    """
+    Page of the finished matches of a player, newest first, as history entries, and the cursor of the next page.
+    """
+    def select(conn):
+        filters, params = ["mp.player_id = ?", "m.result != 'UNFINISHED'"], [player_id]
+        if cursor is not None:
+            filters.append("mp.timestamp < ?")
+            params.append(to_text(cursor))
+        rows = conn.execute(
+            "SELECT m.id, m.timestamp, m.mode, m.result, mp.team FROM match_players mp JOIN matches m ON m.id = mp.match_id "
+            f"WHERE {' AND '.join(filters)} ORDER BY mp.timestamp DESC LIMIT ?",
+            params + [limit + 1],
+        )
+        return [{"id": row["id"], "timestamp": from_text(row["timestamp"]), "mode": row["mode"],
+                 "won": row["team"] == row["result"]} for row in rows]
+
+    return page_of(await run(select), limit)
+
+
+async def get_player_profile(player_id):
+    """
+    Streaks, per-mode breakdown and record with and against every other player, read from the player's rows
+    in match_players.
+    """
+    def select(conn):
+        rows = conn.execute(
+            "SELECT m.timestamp, m.mode, m.result, m.blue_players, m.red_players FROM match_players mp "
+            "JOIN matches m ON m.id = mp.match_id WHERE mp.player_id = ? AND m.result != 'UNFINISHED'",
+            (player_id,),
+        )
+        return [index_entry({"timestamp": row["timestamp"], "mode": row["mode"], "result": row["result"],
+                             "blue_team": {"players": json.loads(row["blue_players"])},
+                             "red_team": {"players": json.loads(row["red_players"])}}, player_id) for row in rows]
+
+    return player_profile(await run(select))
+
+
+def rebuild_participants(conn):
+    """
+    Recompute match_players, the player -> match index, from the player lists of the matches.
+    """
+    with conn:
+        conn.execute("DELETE FROM match_players")
+        for row in conn.execute("SELECT id, timestamp, blue_players, red_players FROM matches").fetchall():
+            match = {"blue_team": {"players": json.loads(row["blue_players"])},
+                     "red_team": {"players": json.loads(row["red_players"])}}
+            insert_participants(conn, row["id"], match, row["timestamp"])
+    return conn.execute("SELECT COUNT(DISTINCT player_id) FROM match_players").fetchone()[0]
+
+
+async def rebuild_player_index():
+    """
+    Recompute the index of every player from the raw matches. Returns the number of players indexed.
+    """
+    return await run(rebuild_participants)
+
+
+# Configuration Management
+async def set_config(config, value):
+    """
+    Set a configuration, merging nested maps like Firestore's set(..., merge=True).
+    """
+    def update(conn):
+        with conn:
+            current = read_settings(conn, "config")
+            if isinstance(value, dict) and isinstance(current.get(config), dict):
+                current[config].update(value)
+            else:
+                current[config] = value
+            write_settings(conn, "config", current)
+
+    await run(update)
+
+
+async def get_config(config):
+    """
+    Get a specific configuration value.
+    """
+    return await run(lambda conn: read_settings(conn, "config").get(config))
+
+
+# Season Management
+async def get_last_season():
+    """
+    Get last season.
+    """
+    row = await run(lambda conn: conn.execute("SELECT * FROM seasons ORDER BY id DESC LIMIT 1").fetchone())
+    return season_document(row)
+
+
+async def get_seasons():
+    """
+    Get every season, ordered by id.
+    """
+    return await run(lambda conn: [season_document(row) for row in conn.execute("SELECT * FROM seasons ORDER BY id")])
+
+
+async def get_season_by_id(season_id: int):
+    """
+    Get season by the specified id.
+    """
+    row = await run(lambda conn: conn.execute("SELECT * FROM seasons WHERE id = ?", (season_id,)).fetchone())
+    return season_document(row) if row else None
+
+
+async def create_new_season():
+    """
+    Create a new season, ending the last one in the same transaction, and freeze the leaderboards of the
+    season that ended.
+    """
+    def create(conn, doc_id):
+        now = to_text(datetime.now(timezone.utc))
+        with conn:
+            last = conn.execute("SELECT * FROM seasons ORDER BY id DESC LIMIT 1").fetchone()
+            conn.execute('UPDATE seasons SET "end" = ? WHERE doc_id = ?', (now, last["doc_id"]))
+            conn.execute('INSERT INTO seasons (doc_id, id, start, "end") VALUES (?, ?, ?, ?)',
+                         (doc_id, last["id"] + 1, now, last["end"]))
+        freeze_leaderboards(conn, last["id"])
+        return season_document(conn.execute("SELECT * FROM seasons WHERE doc_id = ?", (doc_id,)).fetchone())
+
+    return await run(create, new_id())
@@ -0,0 +1,149 @@
+"""
+Pure helpers for the per-season and per-mode stats aggregates.
+"""
+from datetime import datetime, timezone
+
+ALL_SEASONS = "all"
+FINISHED_RESULTS = ("BLUE", "RED")
+BASELINE_WINRATE = 0.5
+
+
+def aggregate_id(season_id, mode):
+    return f"{ALL_SEASONS if season_id is None else season_id}_{mode}"
+
+
+def aggregate_keys(season_id, mode):
+    """
+    (season id, mode) of every aggregate a match of the given season and mode counts towards,
+    with None standing for all seasons.
+    """
+    seasons = [None] if season_id is None else [season_id, None]
+    modes = [0] if not mode else [mode, 0]
+    return [(season, m) for season in seasons for m in modes]
+
+
+def season_id_at(seasons, timestamp):
+    """
+    Id of the season a timestamp falls in, given (season id, start) pairs.
+    """
+    current = None
+    for season_id, start in sorted(seasons, key=lambda season: season[0]):
+        if start is None or timestamp is None or start <= timestamp:
+            current = season_id
+    return current
+
+
+def match_stamps(match, seasons):
+    """
+    The season id, finished flag and players a match dict is stamped with, given (season id, start) pairs, so
+    that season, mode, result and player queries are equality or array_contains filters.
+    """
+    return {"season_id": season_id_at(seasons, match.get("timestamp")), "finished": match.get("result") in FINISHED_RESULTS,
+            "players": match_players(match)}
+
+
+def match_players(match):
+    return match["blue_team"]["players"] + match["red_team"]["players"]
+
+
+def season_closed(season):
+    """
+    Whether a season (None for all seasons) has ended, so its aggregates can no longer change.
+    """
+    return season is not None and season.get("end") is not None and season.get("end") <= datetime.now(timezone.utc)
+
+
+def empty_aggregate(season_id, mode):
+    return {"season": season_id, "mode": mode, "matches": 0, "players": {}}
+
+
+def result_deltas(match, result, sign=1):
+    """
+    Per-player counter changes of recording (sign=1) or reverting (sign=-1) a match result.
+    """
+    if result not in FINISHED_RESULTS:
+        return {}
+
+    winners = match["blue_team"]["players"] if result == "BLUE" else match["red_team"]["players"]
+    losers = match["red_team"]["players"] if result == "BLUE" else match["blue_team"]["players"]
+
+    deltas = {}
+    for player_id in winners:
+        deltas[player_id] = {"wins": sign, "losses": 0, "games": sign}
+    for player_id in losers:
+        deltas[player_id] = {"wins": 0, "losses": sign, "games": sign}
+    return deltas
+
+
+def merge_deltas(*deltas):
+    merged = {}
+    for delta in deltas:
+        for player_id, counters in delta.items():
+            player = merged.setdefault(player_id, {"wins": 0, "losses": 0, "games": 0})
+            for counter, value in counters.items():
+                player[counter] += value
+    return merged
+
+
+def apply_deltas(aggregate, deltas, matches_delta):
+    aggregate["matches"] += matches_delta
+    for player_id, counters in deltas.items():
+        player = aggregate["players"].setdefault(player_id, {"wins": 0, "losses": 0, "games": 0})
+        for counter, value in counters.items():
+            player[counter] += value
+    return aggregate
+
+
+def build_aggregates(matches, season_of):
+    """
+    Recompute every aggregate from raw match dicts. `season_of(match)` returns the match's season id.
+    """
+    aggregates = {}
+    for match in matches:
+        if match.get("result") not in FINISHED_RESULTS:
+            continue
+
+        deltas = result_deltas(match, match["result"])
+        for season, mode in aggregate_keys(season_of(match), match.get("mode")):
+            aggregate = aggregates.setdefault(aggregate_id(season, mode), empty_aggregate(season, mode))
+            apply_deltas(aggregate, deltas, 1)
+    return aggregates
+
+
+def confidence_threshold(stats):
+    """
+    Games a player needs for their winrate to be trusted in full: 25% of the average games of the players
+    who played, between 3 and 15. `stats` maps player ids to their counters.
+    """
+    games_played = [stat["games"] for stat in stats.values() if stat["games"] > 0]
+    if not games_played:
+        return 1
+    return max(3, min(15, int(sum(games_played) / len(games_played) * 0.25)))
+
+
+def player_rating(stat, threshold):
+    """
+    Winrate (0 to 100) pulled towards the 50% baseline for players with fewer games than the threshold.
+    """
+    if stat["games"] == 0:
+        return BASELINE_WINRATE * 100
+
+    confidence = min(stat["games"] / threshold, 1.0)
+    return (confidence * stat["wins"] / stat["games"] + (1 - confidence) * BASELINE_WINRATE) * 100
+
+
+def leaderboard(aggregate):
+    """
+    Leaderboard of an aggregate: the counters of every player plus their winrate and rating.
+    """
+    threshold = confidence_threshold(aggregate["players"])
+    return {
+        "season": aggregate["season"],
+        "mode": aggregate["mode"],
+        "matches": aggregate["matches"],
+        "players": {
+            player_id: {**stat, "winrate": stat["wins"] / stat["games"] * 100 if stat["games"] else 0,
+                        "rating": player_rating(stat, threshold)}
+            for player_id, stat in aggregate["players"].items()
+        },
+    }
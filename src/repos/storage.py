@@ -0,0 +1,53 @@
+"""
+Selects the storage backend the bot runs on from the STORAGE_BACKEND setting, firestore by default.
+"""
+import importlib
+import logging
+import os
+
+from dotenv import load_dotenv
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("storage")
+
+BACKENDS = {
+    "firestore": "repos.firebase_repo",
+    "memory": "repos.memory_repo",
+    "sqlite": "repos.sqlite_repo",
+}
+
+# Functions every backend module provides
+INTERFACE = (
+    "start_listeners",
+    "set_player", "get_players", "get_player_by_id", "get_player_by_discord_id",
+    "get_players_by_id", "get_players_by_discord_id",
+    "add_active_players", "remove_active_player", "clear_active_players", "get_active_players", "add_fixed_players",
+    "store_match", "set_match_victory", "get_player_stats", "rebuild_stats_aggregates", "backfill_match_stamps",
+    "get_season_leaderboard", "freeze_season_leaderboards",
+    "get_match_history", "get_player_profile", "rebuild_player_index",
+    "set_config", "get_config",
+    "get_last_season", "get_seasons", "get_season_by_id", "create_new_season",
+)
+
+
+def load_backend(name=None):
+    """
+    Import the backend module with the given name, by default the configured one.
+    """
+    name = name or os.getenv("STORAGE_BACKEND", "firestore")
+    if name not in BACKENDS:
+        raise Exception(f"Unknown storage backend {name}, expected one of {', '.join(BACKENDS)}")
+
+    backend = importlib.import_module(BACKENDS[name])
+    missing = [function for function in INTERFACE if not callable(getattr(backend, function, None))]
+    if missing:
+        raise Exception(f"Storage backend {name} is missing {', '.join(missing)}")
+
+    logger.info(f"Using the {name} storage backend")
+    return backend
+
+
+# Imported by the commands before main.py loads the .env file, which holds STORAGE_BACKEND and the
+# backend settings
+load_dotenv()
+repo = load_backend()
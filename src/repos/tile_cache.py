@@ -0,0 +1,19 @@
+import os
+
+from utils.sized_lru import SizedLRU
+
+DEFAULT_BUDGET = int(float(os.getenv("CHAMPION_TILE_CACHE_MB", 8)) * 1024 * 1024)
+
+
+class TileCache(SizedLRU):
+    """
+    LRU of decoded RGBA tiles bounded by the memory their pixels use.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET):
+        super().__init__(max_bytes, _tile_bytes)
+
+
+def _tile_bytes(tile):
+    width, height = tile.size
+    return width * height * len(tile.getbands())
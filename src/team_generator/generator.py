@@ -1,6 +1,7 @@
 import random
 import logging
-import repos.firebase_repo as repo
+from repos import stats_aggregates
+from repos.storage import repo
 
 logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger("team_generator")
@@ -12,77 +13,40 @@ async def calculate_player_ratings(players, all_seasons=False):
     Returns a dict with player_id -> rating
     """
     if all_seasons:
-        # Get matches from all seasons by not filtering by season
-        matches = await repo.get_finished_matches(0, None)
+        # All-time aggregate, across every season
+        aggregate = await repo.get_player_stats(0, None)
     else:
         season_ref = await repo.get_last_season()
-        matches = await repo.get_finished_matches(0, season_ref)
+        aggregate = await repo.get_player_stats(0, season_ref)
 
-    # Initialize stats for all players
+    # Stats of every player, read from the aggregate
     stats = {}
     for player in players:
         player_id = player.id if hasattr(player, 'id') else player
-        stats[player_id] = {"wins": 0, "losses": 0, "games": 0}
-
-    # Calculate stats from matches
-    for match in matches:
-        winning_team = match.get("blue_team") if match.get("result") == "BLUE" else match.get("red_team")
-        losing_team = match.get("red_team") if match.get("result") == "BLUE" else match.get("blue_team")
-
-        for player_id in winning_team["players"]:
-            if player_id in stats:
-                stats[player_id]["wins"] += 1
-                stats[player_id]["games"] += 1
-
-        for player_id in losing_team["players"]:
-            if player_id in stats:
-                stats[player_id]["losses"] += 1
-                stats[player_id]["games"] += 1
+        player_stats = aggregate["players"].get(player_id, {})
+        stats[player_id] = {
+            "wins": player_stats.get("wins", 0),
+            "losses": player_stats.get("losses", 0),
+            "games": player_stats.get("games", 0)
+        }
 
     # Calculate dynamic confidence threshold based on match distribution
-    total_matches = len(matches)
+    total_matches = aggregate["matches"]
     games_played = [stat["games"] for stat in stats.values() if stat["games"] > 0]
+    confidence_threshold = stats_aggregates.confidence_threshold(stats)
 
     if not games_played:
         # No games played by anyone, use baseline for all
-        confidence_threshold = 1
         logger.info("No games found, using baseline ratings")
     else:
-        # Calculate statistics about game distribution
         avg_games = sum(games_played) / len(games_played)
-        max_games = max(games_played)
-
-        # Dynamic threshold: 25% of average games or minimum 3, maximum 15
-        confidence_threshold = max(3, min(15, int(avg_games * 0.25)))
+        logger.info(f"Match analysis: Total={total_matches}, Avg games/player={avg_games:.1f}, Max games={max(games_played)}, Confidence threshold={confidence_threshold}")
 
-        logger.info(f"Match analysis: Total={total_matches}, Avg games/player={avg_games:.1f}, Max games={max_games}, Confidence threshold={confidence_threshold}")
-
-    # Calculate rating for each player using confidence-weighted system
+    # Calculate rating for each player using confidence-weighted system:
+    # players with fewer games get pulled toward the 50% baseline (regression to mean)
     ratings = {}
-    baseline_winrate = 0.5  # 50% baseline
-
-    for player in players:
-        player_id = player.id if hasattr(player, 'id') else player
-        stat = stats[player_id]
-
-        if stat["games"] == 0:
-            # No games played, use baseline
-            rating = baseline_winrate * 100
-        else:
-            # Calculate raw winrate
-            raw_winrate = stat["wins"] / stat["games"]
-
-            # Calculate confidence factor (0 to 1)
-            # Players with fewer games get pulled toward the baseline
-            confidence = min(stat["games"] / confidence_threshold, 1.0)
-
-            # Weighted average between raw winrate and baseline
-            # More games = more weight to raw winrate
-            # Fewer games = more weight to baseline (regression to mean)
-            adjusted_winrate = (confidence * raw_winrate) + ((1 - confidence) * baseline_winrate)
-
-            rating = adjusted_winrate * 100
-
+    for player_id, stat in stats.items():
+        rating = stats_aggregates.player_rating(stat, confidence_threshold)
         ratings[player_id] = rating
         logger.info(f"Player {player_id}: {stat['wins']}-{stat['losses']} | Confidence: {min(stat['games'] / confidence_threshold, 1.0):.2f} | Rating: {rating:.1f}")
 
@@ -1,38 +1,121 @@
+import hashlib
 import io
+import os
 import discord
 
 from datetime import datetime
+from functools import lru_cache
 from PIL import Image, ImageDraw
 from repos.champions_repo import ImageDict
+from utils.sized_lru import SizedLRU
 
+IMAGE_LAYOUT = "grid-5x2"
+DEFAULT_IMAGE_ENCODING = os.getenv("IMAGE_ENCODING", "png")
+JPEG_BACKGROUND = (49, 51, 56)
+image_cache = SizedLRU(int(float(os.getenv("IMAGE_CACHE_MB", 16)) * 1024 * 1024))
 
-def create_image_from_champions(champions_list: list[str], data: ImageDict) -> io.BytesIO:
+
+@lru_cache(maxsize=None)
+def number_badge(number: int) -> tuple[Image.Image, tuple[int, int]]:
+    """
+    Pre-render the index number drawn over a champion, returning the badge and
+    its offset relative to the text origin.
+    """
+    text_style = {"font_size": 30, "stroke_width": 2}
+    left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), str(number), **text_style)
+
+    badge = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(badge).text((-left, -top), str(number), fill="white", stroke_fill="black", **text_style)
+    return badge, (left, top)
+
+
+def compose_champions_image(champions_list: list[str], data: ImageDict) -> Image.Image:
     max_width, max_height = 680, 281
     new_im = Image.new('RGBA', (max_width, max_height), (255, 0, 0, 0))
-    new_im_draw = ImageDraw.Draw(new_im)
 
     x_offset = 10
     y_offset = 10
     for idx, champion in enumerate(champions_list):
-        champion_data = data[champion]
-        img = Image.open(io.BytesIO(champion_data["image"]))
-        new_im.paste(img, (x_offset, y_offset))
+        new_im.paste(data.tile(champion), (x_offset, y_offset))
 
-        new_im_draw.text((x_offset + 5, y_offset), str(idx + 1),
-                         font_size=30, fill="white", stroke_width=2, stroke_fill="black")
+        badge, (badge_x, badge_y) = number_badge(idx + 1)
+        new_im.alpha_composite(badge, (x_offset + 5 + badge_x, y_offset + badge_y))
 
         x_offset += 133
         if x_offset >= max_width - 10:
             x_offset = 10
             y_offset += 133
 
+    return new_im
+
+
+def _save_png(image: Image.Image, buffer: io.BytesIO):
+    image.save(buffer, format='PNG')
+
+
+def _save_fast_png(image: Image.Image, buffer: io.BytesIO):
+    image.save(buffer, format='PNG', compress_level=1)
+
+
+def _save_palette_png(image: Image.Image, buffer: io.BytesIO):
+    image.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buffer, format='PNG')
+
+
+def _save_webp(image: Image.Image, buffer: io.BytesIO):
+    image.save(buffer, format='WEBP', lossless=True, method=4)
+
+
+def _save_jpeg(image: Image.Image, buffer: io.BytesIO):
+    background = Image.new('RGB', image.size, JPEG_BACKGROUND)
+    background.paste(image, mask=image.getchannel('A'))
+    background.save(buffer, format='JPEG', quality=90)
+
+
+# encoding mode -> (file extension, encoder)
+IMAGE_ENCODINGS = {
+    "png": ("png", _save_png),
+    "png-fast": ("png", _save_fast_png),
+    "png-palette": ("png", _save_palette_png),
+    "webp": ("webp", _save_webp),
+    "jpeg": ("jpg", _save_jpeg),
+}
+
+
+def image_filename(encoding: str) -> str:
+    return f"image.{IMAGE_ENCODINGS[encoding][0]}"
+
+
+def encode_image(image: Image.Image, encoding: str) -> bytes:
     image_buffer = io.BytesIO()
-    new_im.save(image_buffer, format='PNG')
-    image_buffer.seek(0)
-    return image_buffer
+    IMAGE_ENCODINGS[encoding][1](image, image_buffer)
+    return image_buffer.getvalue()
+
+
+def encode_champions_image(champions_list: list[str], data: ImageDict, encoding: str = DEFAULT_IMAGE_ENCODING) -> bytes:
+    return encode_image(compose_champions_image(champions_list, data), encoding)
 
 
-def create_champion_embed(champions_list: list[str], data: ImageDict, colour: discord.Colour, team: int) -> dict:
+def image_cache_key(champions_list: list[str], data: ImageDict, encoding: str = DEFAULT_IMAGE_ENCODING) -> str:
+    """
+    Content address of a team image: the patch version, layout, encoding and ordered champion ids.
+    """
+    return hashlib.sha256(
+        f"{data.version}|{IMAGE_LAYOUT}|{encoding}|{','.join(champions_list)}".encode()
+    ).hexdigest()
+
+
+def create_image_from_champions(champions_list: list[str], data: ImageDict,
+                                encoding: str = DEFAULT_IMAGE_ENCODING) -> io.BytesIO:
+    """
+    Render a team image, reusing the encoded bytes when the same champions were drawn before.
+    """
+    content = image_cache.get_or_create(image_cache_key(champions_list, data, encoding),
+                                        lambda: encode_champions_image(champions_list, data, encoding))
+    return io.BytesIO(content)
+
+
+def create_champion_embed(champions_list: list[str], data: ImageDict, colour: discord.Colour, team: int,
+                          encoding: str = DEFAULT_IMAGE_ENCODING) -> dict:
     if team == 1:
         embed_description = ("Você está no time Azul :blue_circle:, localizado no lado esquerdo :arrow_left: da "
                              "personalizada. <a:calabreso:1320528277873365012>\n\n```yaml\n")
@@ -42,15 +125,16 @@ def create_champion_embed(champions_list: list[str], data: ImageDict, colour: di
 
     embed_description += "\n".join([data[champ]["name"] for champ in champions_list]) + "\n```"
 
-    image_buffer = create_image_from_champions(champions_list, data)
+    image_buffer = create_image_from_champions(champions_list, data, encoding)
+    filename = image_filename(encoding)
     embed = discord.Embed(
         title="Só os bonecudos",
         description=embed_description,
         color=colour,
     )
-    embed.set_image(url="attachment://image.png")
+    embed.set_image(url=f"attachment://{filename}")
 
-    return {"embed": embed, "file": image_buffer}
+    return {"embed": embed, "file": image_buffer, "filename": filename}
 
 
 def create_active_players_embed(players):
@@ -88,32 +172,78 @@ def create_active_team_embed(players):
     return embed
 
 
-def create_match_history_embed(matches, player):
+def create_match_history_embed(entries, player, page=1):
     """
-    Create an embed displaying the last matches of player.
+    Create an embed displaying a page of the match history of player.
     """
     embed = discord.Embed(title=f"Últimas Partidas de {player.get('nome')}", color=discord.Colour.blurple())
 
-    if not matches:
+    if not entries:
         embed.description = "Este jogador não possui partidas finalizadas."
         return embed
 
-    for match in matches:
-        match_date = match.get("timestamp")
-        mode = match.get("mode")
-        winner_team = (
-            match.get("blue_team")["players"]
-            if match.get("result") == "BLUE" else
-            match.get("red_team")["players"]
-        )
-        result = player.id in winner_team
+    for entry in entries:
+        match_date = entry["timestamp"]
+        mode = entry["mode"]
 
         if isinstance(match_date, datetime):
             match_date = match_date.strftime("%d/%m/%Y %H:%M")
 
         embed.add_field(
             name=f"{match_date} - {mode}X{mode}",
-            value=("Vitória" if result else "Derrota"),
+            value=("Vitória" if entry["won"] else "Derrota"),
             inline=False
         )
+    embed.set_footer(text=f"Página {page}")
+    return embed
+
+
+def format_record(record):
+    winrate = record["wins"] / record["games"] * 100 if record["games"] else 0
+    return f"{record['wins']}V {record['losses']}D ({winrate:.0f}%)"
+
+
+def format_streak(streak):
+    if not streak:
+        return "-"
+    return f"{streak} vitórias" if streak > 0 else f"{-streak} derrotas"
+
+
+def add_record_fields(embed, name, records, discord_ids):
+    """
+    Add the records with or against other players, most played first, split into fields of up to 1024 characters.
+    """
+    lines = [
+        f"<@{discord_ids[player_id]}> - {format_record(record)}"
+        for player_id, record in sorted(records.items(), key=lambda item: item[1]["games"], reverse=True)
+        if player_id in discord_ids
+    ]
+    value = ""
+    for line in lines:
+        if len(value) + len(line) + 1 > 1024:
+            embed.add_field(name=name, value=value, inline=True)
+            value = ""
+        value += f"{line}\n"
+    if value:
+        embed.add_field(name=name, value=value, inline=True)
+
+
+def create_profile_embed(profile, player, discord_ids):
+    """
+    Create an embed displaying the profile of a player. discord_ids maps player ids to discord ids.
+    """
+    embed = discord.Embed(title=f"Perfil de {player.get('nome')}", color=discord.Colour.blurple())
+
+    if not profile["record"]["games"]:
+        embed.description = "Este jogador não possui partidas finalizadas."
+        return embed
+
+    embed.description = (f"**{profile['record']['games']} jogos** - {format_record(profile['record'])}\n"
+                         f"Sequência atual: {format_streak(profile['current_streak'])}\n"
+                         f"Maior sequência de vitórias: {profile['best_streak']}")
+    embed.add_field(name="Por modo", inline=False, value="\n".join(
+        f"{mode}X{mode} - {format_record(record)}" for mode, record in sorted(profile["modes"].items())
+    ))
+    add_record_fields(embed, "Jogando com", profile["allies"], discord_ids)
+    add_record_fields(embed, "Jogando contra", profile["opponents"], discord_ids)
     return embed
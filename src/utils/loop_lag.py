@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task that sleeps every `interval`
+    seconds. Anything blocking the loop shows up as lag.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    @property
+    def max_lag(self):
+        return max(self.samples, default=0.0)
+
+    @property
+    def mean_lag(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - start - self.interval)
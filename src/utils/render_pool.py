@@ -0,0 +1,74 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(format='%(levelname)s %(name)s %(asctime)s: %(message)s', level=logging.INFO)
+logger = logging.getLogger("render_pool")
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", 2))
+
+
+class RenderPool:
+    """
+    Worker threads for Pillow rendering, so compositing and encoding never block
+    the event loop. Pillow releases the GIL while pasting and encoding, so
+    renders also run in parallel with each other.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.workers = workers
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+
+    @property
+    def queue_depth(self):
+        return self.queued
+
+    def stats(self):
+        return {"workers": self.workers, "queued": self.queued, "running": self.running, "completed": self.completed}
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run `func` in a worker thread and wait for its result.
+        """
+        job = {"queued": True}
+        with self._lock:
+            self.queued += 1
+        if self.queued > self.workers:
+            logger.info(f"Render queue backing up: {self.stats()}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(self._call, job, func, *args, **kwargs))
+        finally:
+            # A cancelled run may never reach a worker
+            self._dequeue(job)
+            self.completed += 1
+
+    def _dequeue(self, job):
+        with self._lock:
+            if job["queued"]:
+                job["queued"] = False
+                self.queued -= 1
+
+    def _call(self, job, func, *args, **kwargs):
+        self._dequeue(job)
+        with self._lock:
+            self.running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_pool = RenderPool()
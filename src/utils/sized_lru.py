@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+
+class SizedLRU:
+    """
+    Thread-safe LRU bounded by the total size of its values, as measured by `sizeof`.
+    """
+
+    def __init__(self, max_bytes, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def get_or_create(self, key, factory):
+        """
+        Get the value stored under `key`, creating it with `factory()` on a miss.
+        """
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            self.stats["misses"] += 1
+
+        value = factory()
+        value_size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._values or value_size > self.max_bytes:
+                return value
+
+            self._values[key] = value
+            self.size += value_size
+            while self.size > self.max_bytes:
+                _, evicted = self._values.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+                self.stats["evictions"] += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.size = 0
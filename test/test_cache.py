@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from src.repos.cache import RepoCache
+
+
+class TestRepoCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RepoCache()
+        self.loads = []
+
+        @self.cache.cached(tags=lambda player_id: ["players", f"player:{player_id}"])
+        async def get_player(player_id):
+            self.loads.append(player_id)
+            await asyncio.sleep(0)
+            return {"id": player_id}
+
+        self.get_player = get_player
+
+    def test_hits_are_served_from_memory_and_counted(self):
+        async def run():
+            await self.get_player("a")
+            await self.get_player("a")
+            await self.get_player("b")
+
+        asyncio.run(run())
+
+        metrics = self.cache.metrics()["get_player"]
+        self.assertEqual(self.loads, ["a", "b"])
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["entries"]), (1, 2, 2))
+
+    def test_concurrent_misses_load_once(self):
+        async def run():
+            return await asyncio.gather(*[self.get_player("a") for _ in range(5)])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(self.loads, ["a"])
+        self.assertEqual(results, [{"id": "a"}] * 5)
+
+    def test_invalidation_only_drops_entries_with_the_tag(self):
+        async def run():
+            await self.get_player("a")
+            await self.get_player("b")
+            self.cache.invalidate("player:a")
+            await self.get_player("a")
+            await self.get_player("b")
+
+        asyncio.run(run())
+
+        self.assertEqual(self.loads, ["a", "b", "a"])
+
+    def test_loads_overlapping_an_invalidation_are_not_stored(self):
+        async def run():
+            stale = asyncio.ensure_future(self.get_player("a"))
+            await asyncio.sleep(0)
+            self.cache.invalidate("players")
+            await stale
+            await self.get_player("a")
+            await self.get_player("a")
+
+        asyncio.run(run())
+
+        self.assertEqual(self.loads, ["a", "a"])
+
+    def test_lookups_after_an_invalidation_do_not_join_the_stale_load(self):
+        async def run():
+            stale = asyncio.ensure_future(self.get_player("a"))
+            await asyncio.sleep(0)
+            self.cache.invalidate("player:a")
+            await asyncio.gather(stale, self.get_player("a"))
+
+        asyncio.run(run())
+
+        self.assertEqual(self.loads, ["a", "a"])
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        cache = RepoCache(max_bytes=3500)
+        for key in ("a", "b", "c"):
+            cache.set(f"f:{key}", "x" * 1000, ["f"])
+        cache.get("f:a")
+        cache.set("f:d", "x" * 1000, ["f"])
+
+        self.assertLessEqual(cache.size, 3500)
+        self.assertIsNone(cache.get("f:b"))
+        self.assertIsNotNone(cache.get("f:a"))
+        self.assertEqual(cache.metrics()["f"]["evictions"], 1)
+
+    def test_replacing_a_value_keeps_its_tags(self):
+        self.cache.set("f:a", [1], ["t"])
+        self.cache.set("f:a", [1, 2])
+
+        self.assertEqual(self.cache.items("t"), [("f:a", [1, 2])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+from bench.fake_ddragon import FakeDataDragon
+from src.repos import champions_repo
+from src.repos.asset_store import AssetStore
+from src.repos.http_client import HttpClient
+
+
+def png(seed):
+    content = io.BytesIO()
+    Image.new("RGB", (120, 120), (seed, 255 - seed, 0)).save(content, format="PNG")
+    return content.getvalue()
+
+
+def load(store, client=None):
+    async def run():
+        async with client or HttpClient() as session:
+            return await champions_repo.ImageDict(store).load(session)
+
+    return asyncio.run(run())
+
+
+class TestImageDictCache(unittest.TestCase):
+
+    def setUp(self):
+        champions = {f"Champion{i}": png(i) for i in range(20)}
+        self.ddragon = FakeDataDragon(["14.1.1"], champions)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = AssetStore(self.tmp.name)
+        self.patcher = patch.object(champions_repo, "BASE_API_URL", self.ddragon.url)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.ddragon.close()
+        self.tmp.cleanup()
+
+    def test_warm_restart_loads_from_disk(self):
+        cold = load(self.store)
+        self.assertEqual(len(self.ddragon.image_requests()), 20)
+
+        self.ddragon.requests.clear()
+        warm = load(self.store)
+
+        self.assertEqual(self.ddragon.requests, ["/api/versions.json"])
+        self.assertEqual(warm.stats["disk"], 20)
+        self.assertEqual(dict(warm), dict(cold))
+
+    def test_new_patch_only_fetches_changed_champions(self):
+        load(self.store)
+
+        self.ddragon.versions = ["14.2.1", "14.1.1"]
+        self.ddragon.champions["Champion3"] = png(100)
+        self.ddragon.champions["NewChampion"] = png(200)
+        self.ddragon.requests.clear()
+
+        data = load(self.store)
+
+        self.assertEqual(data.version, "14.2.1")
+        self.assertEqual(data.stats, {"disk": 0, "revalidated": 19, "downloaded": 2})
+        self.assertEqual(data.image("Champion3"), png(100))
+        self.assertEqual(data.image("NewChampion"), png(200))
+        self.assertEqual(data.tile("Champion3").getpixel((0, 0)), (100, 155, 0, 255))
+        self.assertEqual(self.store.versions(), ["14.2.1", "14.1.1"])
+
+    def test_offline_restart_uses_latest_cached_version(self):
+        load(self.store)
+
+        with patch.object(champions_repo, "BASE_API_URL", "http://127.0.0.1:1"):
+            data = load(self.store, HttpClient(retries=0))
+
+        self.assertEqual(data.version, "14.1.1")
+        self.assertEqual(len(data), 20)
+
+    def test_server_errors_are_retried(self):
+        self.ddragon.failures["/cdn/14.1.1/img/champion/Champion7.png"] = 2
+        client = HttpClient(backoff=0)
+
+        data = load(self.store, client)
+
+        self.assertEqual(len(data), 20)
+        self.assertEqual(client.stats["retries"], 2)
+        self.assertLessEqual(client.stats["connections"], client.max_connections)
+
+    def test_failed_champion_is_left_out_and_retried_on_the_next_load(self):
+        self.ddragon.failures["/cdn/14.1.1/img/champion/Champion7.png"] = 10
+
+        partial = load(self.store, HttpClient(retries=1, backoff=0))
+        self.ddragon.failures.clear()
+        self.ddragon.requests.clear()
+        complete = load(self.store)
+
+        self.assertEqual((len(partial), partial.missing), (19, ["Champion7"]))
+        self.assertEqual(self.store.versions(), ["14.1.1"])
+        self.assertEqual(self.ddragon.image_requests(), ["/cdn/14.1.1/img/champion/Champion7.png"])
+        self.assertEqual((len(complete), complete.missing), (20, []))
+        self.assertEqual(complete.stats["disk"], 19)
+
+    def test_champion_whose_image_was_deleted_is_fetched_again(self):
+        cold = load(self.store)
+        os.remove(self.store.blob_path(cold["Champion3"]["blob"]))
+        self.ddragon.requests.clear()
+
+        warm = load(self.store)
+
+        self.assertEqual(self.ddragon.image_requests(), ["/cdn/14.1.1/img/champion/Champion3.png"])
+        self.assertEqual(warm.tile("Champion3").getpixel((0, 0)), (3, 252, 0, 255))
+        self.assertEqual(warm.missing, [])
+
+    def test_tiles_are_served_from_the_sprite_atlas(self):
+        load(self.store)
+        data = load(self.store)
+
+        tile = data.tile("Champion5")
+
+        self.assertEqual(len(data.atlas), 20)
+        self.assertEqual((tile.mode, tile.size), ("RGBA", (120, 120)))
+        self.assertEqual(tile.getpixel((60, 60)), (5, 250, 0, 255))
+        self.assertEqual(data.tiles.stats["misses"], 0)
+
+    def test_corrupt_sprite_atlas_is_rebuilt(self):
+        directory = self.store.version_dir(load(self.store).version)
+        with open(os.path.join(directory, "atlas.json"), "w") as f:
+            f.write('{"tile_size": 1')
+        rebuilt = load(self.store)
+        with open(os.path.join(directory, "atlas.rgba"), "r+b") as f:
+            f.truncate(1000)
+
+        truncated = load(self.store)
+
+        self.assertEqual(len(rebuilt.atlas), 20)
+        self.assertEqual(len(truncated.atlas), 20)
+        self.assertEqual(truncated.tile("Champion19").getpixel((60, 60)), (19, 236, 0, 255))
+
+    def test_other_tile_sizes_are_decoded_lazily_and_cached(self):
+        data = load(self.store)
+
+        tile = data.tile("Champion0", 64)
+        data.tile("Champion0", 64)
+
+        self.assertEqual((tile.mode, tile.size), ("RGBA", (64, 64)))
+        self.assertEqual(data.tiles.stats, {"hits": 1, "misses": 1, "evictions": 0})
+
+    def test_patch_watcher_swaps_roster_on_new_patch(self):
+        watcher = champions_repo.PatchWatcher(self.store)
+
+        async def run():
+            async with HttpClient() as client:
+                first = await watcher.refresh(client)
+                in_flight = watcher.data
+                unchanged = await watcher.refresh(client)
+
+                self.ddragon.versions = ["14.2.1", "14.1.1"]
+                self.ddragon.champions["NewChampion"] = png(200)
+                swapped = await watcher.refresh(client)
+                return first, unchanged, swapped, in_flight
+
+        first, unchanged, swapped, in_flight = asyncio.run(run())
+
+        self.assertEqual((first, unchanged, swapped), (True, False, True))
+        self.assertEqual(watcher.version, "14.2.1")
+        self.assertIn("NewChampion", watcher.data)
+        self.assertEqual((in_flight.version, len(in_flight)), ("14.1.1", 20))
+        self.assertEqual(watcher.data.stats, {"disk": 0, "revalidated": 20, "downloaded": 1})
+        self.assertIsNotNone(watcher.last_refresh_duration)
+
+    def test_patch_watcher_falls_back_to_the_cached_patch_until_the_new_one_loads(self):
+        load(self.store)
+        self.ddragon.versions = ["14.2.1", "14.1.1"]
+        self.ddragon.failures["/cdn/14.2.1/data/en_US/champion.json"] = 10
+        watcher = champions_repo.PatchWatcher(self.store)
+
+        async def run():
+            async with HttpClient(retries=1, backoff=0) as client:
+                fallback = await watcher.refresh(client)
+                version = watcher.version
+                self.ddragon.failures.clear()
+                return fallback, version, await watcher.refresh(client)
+
+        fallback, version, swapped = asyncio.run(run())
+
+        self.assertEqual((fallback, version, swapped), (True, "14.1.1", True))
+        self.assertEqual(watcher.version, "14.2.1")
+
+
+if __name__ == '__main__':
+    unittest.main()
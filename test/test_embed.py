@@ -0,0 +1,69 @@
+import io
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+from src.repos.asset_store import AssetStore
+from src.repos.champions_repo import ImageDict
+from src.utils import embed
+from src.utils.sized_lru import SizedLRU
+
+
+def roster(root, version="14.1.1"):
+    store = AssetStore(root)
+    data = ImageDict(store)
+    data.version = version
+    for i in range(10):
+        content = io.BytesIO()
+        Image.new("RGB", (120, 120), (i * 20, 0, 0)).save(content, format="PNG")
+        data[f"Champion{i}"] = {"name": f"Champion {i}", "blob": store.write_blob(content.getvalue())}
+    return data
+
+
+class TestCreateImageFromChampions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = roster(self.tmp.name)
+        self.cache = SizedLRU(1024 * 1024)
+        self.patcher = patch.object(embed, "image_cache", self.cache)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_repeated_draw_is_served_from_cache(self):
+        first = embed.create_image_from_champions(["Champion1", "Champion2"], self.data)
+
+        with patch.object(embed, "compose_champions_image") as compose:
+            second = embed.create_image_from_champions(["Champion1", "Champion2"], self.data)
+            compose.assert_not_called()
+
+        self.assertEqual(first.read(), second.read())
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.hit_rate, 0.5)
+
+    def test_order_and_version_are_part_of_the_key(self):
+        embed.create_image_from_champions(["Champion1", "Champion2"], self.data)
+        embed.create_image_from_champions(["Champion2", "Champion1"], self.data)
+        self.data.version = "14.2.1"
+        embed.create_image_from_champions(["Champion1", "Champion2"], self.data)
+
+        self.assertEqual(self.cache.stats["misses"], 3)
+        self.assertEqual(len(self.cache), 3)
+
+    def test_every_encoding_mode_produces_its_format(self):
+        formats = {"png": "PNG", "png-fast": "PNG", "png-palette": "PNG", "webp": "WEBP", "jpeg": "JPEG"}
+
+        for encoding, image_format in formats.items():
+            image = Image.open(embed.create_image_from_champions(["Champion1", "Champion2"], self.data, encoding))
+            self.assertEqual((image.format, image.size), (image_format, (680, 281)))
+            self.assertTrue(embed.image_filename(encoding).startswith("image."))
+
+        self.assertEqual(self.cache.stats["misses"], len(formats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+
+from src.repos import match_cache
+from src.repos.cache import RepoCache
+
+
+class Doc:
+    def __init__(self, _id, data):
+        self.id = _id
+        self.data = data
+
+    def get(self, field):
+        return self.data.get(field)
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+def match(_id, timestamp, blue=("a",), red=("b",)):
+    return Doc(_id, {"timestamp": timestamp, "mode": len(blue), "result": "BLUE",
+                     "blue_team": {"players": list(blue)}, "red_team": {"players": list(red)}})
+
+
+class TestMatchCache(unittest.TestCase):
+
+    def test_finished_match_is_added_to_the_cached_recent_histories_of_its_players(self):
+        cache = RepoCache()
+        cache.set(match_cache.player_history_key("a"),
+                  {"entries": [{"id": "m3", "timestamp": 30, "mode": 1, "won": False}], "complete": True})
+
+        match_cache.patch_player_history(cache, match("m2", 20))
+
+        self.assertEqual(cache.get(match_cache.player_history_key("a"))["entries"],
+                         [{"id": "m3", "timestamp": 30, "mode": 1, "won": False},
+                          {"id": "m2", "timestamp": 20, "mode": 1, "won": True}])
+        self.assertIsNone(cache.get(match_cache.player_history_key("b")))
+
+    def test_stats_load_overlapping_a_recorded_result_is_not_cached(self):
+        cache = RepoCache()
+        reads = []
+        committed = asyncio.Event()
+
+        @cache.cached(tags=["stats"], key=lambda mode, season_id: match_cache.player_stats_key(mode, season_id))
+        async def get_player_stats(mode, season_id):
+            aggregate = {"season": season_id, "mode": mode, "matches": len(reads), "players": {}}
+            reads.append(aggregate)
+            await committed.wait()
+            return aggregate
+
+        async def set_match_victory():
+            # The result is committed while the aggregate read above is still in flight
+            await asyncio.sleep(0)
+            match_cache.patch_player_stats(cache, 3, 1, {"a": {"wins": 1}}, 1)
+            committed.set()
+
+        async def run():
+            stale, _ = await asyncio.gather(get_player_stats(0, 3), set_match_victory())
+            return stale, await get_player_stats(0, 3)
+
+        stale, fresh = asyncio.run(run())
+
+        self.assertEqual(stale["matches"], 0)
+        self.assertEqual(fresh["matches"], 1)
+        self.assertEqual(len(reads), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from src.repos import match_history
+
+
+def entry(_id, timestamp):
+    return {"id": _id, "timestamp": timestamp, "mode": 1, "won": True}
+
+
+class TestMatchHistory(unittest.TestCase):
+
+    def test_pages_are_sliced_from_a_complete_recent_history(self):
+        recent = match_history.recent_history([entry(f"m{t}", t) for t in (50, 40, 30, 20, 10)])
+
+        first, cursor = match_history.history_page(recent, 2)
+        second, cursor = match_history.history_page(recent, 2, cursor)
+        last, cursor = match_history.history_page(recent, 2, cursor)
+
+        self.assertEqual([[e["id"] for e in page] for page in (first, second, last)],
+                         [["m50", "m40"], ["m30", "m20"], ["m10"]])
+        self.assertIsNone(cursor)
+
+    def test_pages_past_an_incomplete_recent_history_are_read_from_the_database(self):
+        entries = [entry(f"m{t}", t) for t in range(match_history.HISTORY_CACHE_SIZE + 1, 0, -1)]
+        recent = match_history.recent_history(entries)
+
+        page, cursor = match_history.history_page(recent, 10)
+
+        self.assertFalse(recent["complete"])
+        self.assertEqual(cursor, page[-1]["timestamp"])
+        self.assertIsNone(match_history.history_page(recent, 10, recent["entries"][-5]["timestamp"]))
+
+    def test_older_matches_are_not_added_to_an_incomplete_recent_history(self):
+        recent = {"entries": [entry("m3", 30), entry("m2", 20)], "complete": False}
+
+        self.assertIs(match_history.add_to_recent_history(recent, entry("m1", 10)), recent)
+        self.assertEqual([e["id"] for e in match_history.add_to_recent_history(recent, entry("m4", 40))["entries"]],
+                         ["m4", "m3", "m2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+os.environ["STORAGE_BACKEND"] = "memory"
+
+from src.repos import memory_repo, storage  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def raw_match(_id, hours, result="BLUE", blue=("a",), red=("b",)):
+    return {"_id": _id, "timestamp": START + timedelta(hours=hours), "mode": len(blue), "result": result,
+            "blue_team": {"players": list(blue)}, "red_team": {"players": list(red)}}
+
+
+class TestMemoryRepo(unittest.TestCase):
+
+    def setUp(self):
+        memory_repo.load_dataset(
+            players=[{"_id": "a", "nome": "A", "discord_id": 1}, {"_id": "b", "nome": "B", "discord_id": 2},
+                     {"_id": "c", "nome": "C", "discord_id": 3}, {"_id": "d", "nome": "D", "discord_id": 4}],
+            matches=[raw_match("m1", 1), raw_match("m2", 2, "RED"), raw_match("m3", 30, blue=("a", "c"), red=("b", "d")),
+                     raw_match("m4", 31, "UNFINISHED")],
+            seasons=[{"_id": "s1", "id": 1, "start": START, "end": START + timedelta(hours=24)},
+                     {"_id": "s2", "id": 2, "start": START + timedelta(hours=24), "end": START + timedelta(days=365)}],
+        )
+
+    def test_history_is_newest_first_and_skips_unfinished_matches(self):
+        async def run():
+            first = await memory_repo.get_match_history("a", 2)
+            return first, await memory_repo.get_match_history("a", 2, first[1])
+
+        (first, cursor), (second, last_cursor) = asyncio.run(run())
+
+        self.assertEqual([(entry["id"], entry["won"]) for entry in first], [("m3", True), ("m2", False)])
+        self.assertEqual(cursor, START + timedelta(hours=2))
+        self.assertEqual([entry["id"] for entry in second], ["m1"])
+        self.assertIsNone(last_cursor)
+
+    def test_profile_reads_the_player_matches(self):
+        profile = asyncio.run(memory_repo.get_player_profile("a"))
+
+        self.assertEqual(profile["record"], {"wins": 2, "losses": 1, "games": 3})
+        self.assertEqual((profile["current_streak"], profile["best_streak"]), (1, 1))
+        self.assertEqual(profile["allies"], {"c": {"wins": 1, "losses": 0, "games": 1}})
+        self.assertEqual(profile["opponents"]["b"], {"wins": 2, "losses": 1, "games": 3})
+
+    def test_recording_a_result_updates_the_season_and_all_time_stats(self):
+        async def run():
+            await memory_repo.add_active_players([1, 2])
+            players = await memory_repo.get_active_players()
+            match_id = await memory_repo.store_match({"blue_team": {"players": players[:1], "champions": []},
+                                                      "red_team": {"players": players[1:], "champions": []}})
+            await memory_repo.set_match_victory(match_id, "RED")
+            await memory_repo.set_match_victory(match_id, "BLUE")
+            season = await memory_repo.get_last_season()
+            return await memory_repo.get_player_stats(1, season), await memory_repo.get_player_stats(0, None)
+
+        season, all_time = asyncio.run(run())
+
+        self.assertEqual(season["players"]["a"], {"wins": 1, "losses": 0, "games": 1})
+        self.assertEqual(season["matches"], 1)
+        self.assertEqual(all_time["players"]["a"], {"wins": 3, "losses": 1, "games": 4})
+        self.assertEqual(all_time["matches"], 4)
+
+    def test_matches_are_stamped_with_their_season_and_backfilled_after_a_boundary_change(self):
+        async def run():
+            stamped = [memory_repo.state.matches[_id]["season_id"] for _id in ("m1", "m3", "m4")]
+            memory_repo.state.seasons["s2"]["start"] = START + timedelta(hours=2)
+            return stamped, await memory_repo.backfill_match_stamps()
+
+        stamped, updated = asyncio.run(run())
+
+        self.assertEqual(stamped, [1, 2, 2])
+        self.assertEqual(updated, 1)
+        self.assertEqual(memory_repo.state.matches["m2"]["season_id"], 2)
+        self.assertFalse(memory_repo.state.matches["m4"]["finished"])
+
+    def test_new_players_and_config_are_visible(self):
+        async def run():
+            await memory_repo.set_player("E", SimpleNamespace(id=5))
+            await memory_repo.set_config("image_encoding", {"1": "png"})
+            await memory_repo.set_config("image_encoding", {"2": "webp"})
+            return await memory_repo.get_player_by_discord_id(5), await memory_repo.get_config("image_encoding")
+
+        player, encoding = asyncio.run(run())
+
+        self.assertEqual(player.get("nome"), "E")
+        self.assertEqual(encoding, {"1": "png", "2": "webp"})
+
+
+class TestStorage(unittest.TestCase):
+
+    def test_memory_backend_provides_the_interface(self):
+        self.assertEqual(storage.load_backend("memory").__name__, "repos.memory_repo")
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(Exception):
+            storage.load_backend("postgres")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from src import migrate
+
+
+class Snapshot:
+    def __init__(self, collection, _id):
+        self.id = _id
+        self.reference = (collection.name, _id)
+        self.data = collection.documents.get(_id)
+
+    def get(self, field):
+        return self.data.get(field)
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class Query:
+    def __init__(self, collection, limit=None, after=None):
+        self.collection = collection
+        self._limit = limit
+        self.after = after
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, limit):
+        return Query(self.collection, limit, self.after)
+
+    def start_after(self, cursor):
+        after = cursor["__name__"].id if isinstance(cursor, dict) else cursor.id
+        return Query(self.collection, self._limit, after)
+
+    async def stream(self):
+        ids = [_id for _id in sorted(self.collection.documents) if self.after is None or _id > self.after]
+        for _id in ids[:self._limit]:
+            yield Snapshot(self.collection, _id)
+
+
+class Collection(Query):
+    def __init__(self, name, documents):
+        super().__init__(self)
+        self.name = name
+        self.documents = documents
+
+    def document(self, _id):
+        class Reference:
+            id = _id
+
+        return Reference()
+
+
+class Batch:
+    def __init__(self, db):
+        self.db = db
+        self.updates = []
+
+    def update(self, reference, changes):
+        self.updates.append((reference, changes))
+
+    async def commit(self):
+        self.db.in_flight += 1
+        self.db.max_in_flight = max(self.db.max_in_flight, self.db.in_flight)
+        await asyncio.sleep(0)
+        self.db.in_flight -= 1
+        if any(_id == self.db.fail_on for (_, _id), _ in self.updates):
+            raise Exception("commit failed")
+        for (name, _id), changes in self.updates:
+            self.db.collections[name][_id].update(changes)
+
+
+class Db:
+    def __init__(self, matches):
+        self.collections = {"seasons": {"s1": {"id": 1, "start": 0}, "s2": {"id": 2, "start": 100}},
+                            "matches": matches}
+        self.in_flight = self.max_in_flight = 0
+        self.fail_on = None
+
+    def collection(self, name):
+        return Collection(name, self.collections[name])
+
+    def batch(self):
+        return Batch(self)
+
+
+def matches():
+    return {f"m{i:03}": {"timestamp": i * 10, "result": "BLUE" if i % 3 else "UNFINISHED",
+                         "blue_team": {"players": ["a"]}, "red_team": {"players": ["b"]}} for i in range(30)}
+
+
+class TestMigrate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stamps_are_written_in_bounded_parallel_batches(self):
+        db = Db(matches())
+
+        checkpoint = asyncio.run(migrate.migrate(db, migrate.stamps, migrate.new_checkpoint("stamps"), self.path,
+                                                 page_size=10, batch_size=2, concurrency=3))
+
+        self.assertEqual((checkpoint["read"], checkpoint["updated"], checkpoint["last_id"]), (30, 30, "m029"))
+        self.assertEqual(db.collections["matches"]["m011"], {"timestamp": 110, "result": "BLUE",
+                                                             "blue_team": {"players": ["a"]},
+                                                             "red_team": {"players": ["b"]},
+                                                             "season_id": 2, "finished": True, "players": ["a", "b"]})
+        self.assertEqual(db.max_in_flight, 3)
+        self.assertEqual(migrate.load_checkpoint(self.path, "stamps"), checkpoint)
+
+    def test_dry_run_writes_nothing(self):
+        db = Db(matches())
+
+        checkpoint = asyncio.run(migrate.migrate(db, migrate.stamps, migrate.new_checkpoint("stamps"), page_size=7))
+
+        self.assertEqual(checkpoint["updated"], 30)
+        self.assertNotIn("season_id", db.collections["matches"]["m001"])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failed_migration_resumes_after_the_last_committed_page(self):
+        db = Db(matches())
+        db.fail_on = "m025"
+
+        with self.assertRaises(Exception):
+            asyncio.run(migrate.migrate(db, migrate.stamps, migrate.new_checkpoint("stamps"), self.path, page_size=10))
+        checkpoint = migrate.load_checkpoint(self.path, "stamps")
+        db.fail_on = None
+        resumed = asyncio.run(migrate.migrate(db, migrate.stamps, checkpoint, self.path, page_size=10))
+
+        self.assertEqual(checkpoint["last_id"], "m019")
+        self.assertEqual((resumed["read"], resumed["updated"]), (30, 30))
+        self.assertTrue(all("season_id" in match for match in db.collections["matches"].values()))
+
+    def test_resumes_after_a_deleted_checkpoint_match(self):
+        db = Db(matches())
+        checkpoint = {**migrate.new_checkpoint("stamps"), "last_id": "m019", "read": 20}
+        del db.collections["matches"]["m019"]
+
+        resumed = asyncio.run(migrate.migrate(db, migrate.stamps, checkpoint, self.path, page_size=4))
+
+        self.assertEqual((resumed["read"], resumed["updated"], resumed["last_id"]), (30, 10, "m029"))
+        self.assertNotIn("season_id", db.collections["matches"]["m018"])
+        self.assertIn("season_id", db.collections["matches"]["m020"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+
+from src.repos.player_directory import PlayerDirectory
+
+
+class Doc:
+    def __init__(self, _id, discord_id):
+        self.id = _id
+        self.data = {"discord_id": discord_id}
+
+    def get(self, field):
+        return self.data.get(field)
+
+
+class FakeQuery:
+    def __init__(self):
+        self.watches = []
+
+    def on_snapshot(self, callback):
+        self.callback = callback
+        self.watches.append(SimpleNamespace(is_active=True, unsubscribe=lambda: None))
+        return self.watches[-1]
+
+
+def change(change_type, doc):
+    return SimpleNamespace(type=SimpleNamespace(name=change_type), document=doc)
+
+
+class TestPlayerDirectory(unittest.TestCase):
+
+    def test_changes_keep_both_indexes_current(self):
+        changed = []
+        directory = PlayerDirectory(on_change=lambda: changed.append(True))
+
+        directory.apply([("ADDED", Doc("a", 1)), ("ADDED", Doc("b", 2))])
+        directory.apply([("MODIFIED", Doc("a", 3)), ("REMOVED", Doc("b", 2))])
+
+        self.assertEqual(directory.get_by_discord_id(3).id, "a")
+        self.assertIsNone(directory.get_by_discord_id(1))
+        self.assertIsNone(directory.get("b"))
+        self.assertEqual([p.id for p in directory.all()], ["a"])
+        self.assertEqual(len(changed), 2)
+
+    def test_snapshots_from_the_watch_thread_are_applied_on_the_loop(self):
+        async def run():
+            directory = PlayerDirectory()
+            query = FakeQuery()
+            directory.watch(query)
+
+            thread = threading.Thread(target=query.callback, args=([], [change("ADDED", Doc("a", 1))], None))
+            thread.start()
+            thread.join()
+            self.assertFalse(directory.ready)
+
+            await asyncio.sleep(0)
+            return directory
+
+        directory = asyncio.run(run())
+
+        self.assertTrue(directory.ready)
+        self.assertEqual(directory.get_by_discord_id(1).id, "a")
+
+    def test_stopped_listener_falls_back_to_the_database_and_subscribes_again(self):
+        async def run():
+            changed = []
+            directory = PlayerDirectory(on_change=lambda: changed.append(True))
+            query = FakeQuery()
+            directory.watch(query)
+            directory.apply([("ADDED", Doc("a", 1)), ("ADDED", Doc("b", 2))])
+            self.assertFalse(directory.check())
+
+            query.watches[0].is_active = False
+            self.assertTrue(directory.check())
+            self.assertFalse(directory.ready)
+            self.assertIsNone(directory.get("b"))
+
+            query.callback([], [change("ADDED", Doc("a", 1))], None)
+            await asyncio.sleep(0)
+            ready = directory.ready
+            directory.close()
+            return ready, directory, query, changed
+
+        ready, directory, query, changed = asyncio.run(run())
+
+        self.assertTrue(ready)
+        self.assertEqual([p.id for p in directory.all()], ["a"])
+        self.assertEqual(len(query.watches), 2)
+        self.assertEqual(len(changed), 3)
+
+    def test_snapshot_that_fails_to_apply_subscribes_again(self):
+        async def run():
+            directory = PlayerDirectory()
+            query = FakeQuery()
+            directory.watch(query)
+
+            query.callback([], [change("ADDED", None)], None)
+            await asyncio.sleep(0)
+            directory.close()
+            return directory, query
+
+        directory, query = asyncio.run(run())
+
+        self.assertFalse(directory.ready)
+        self.assertEqual(len(query.watches), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from src.repos import player_index
+
+
+def match(timestamp, result, blue=("a", "b"), red=("c", "d")):
+    return {"timestamp": timestamp, "mode": len(blue), "result": result,
+            "blue_team": {"players": list(blue)}, "red_team": {"players": list(red)}}
+
+
+class TestPlayerIndex(unittest.TestCase):
+
+    def test_entries_hold_the_team_allies_and_opponents_of_each_player(self):
+        entries = player_index.index_entries(match(1, "RED"))
+
+        self.assertEqual(entries["b"], {"timestamp": 1, "mode": 2, "team": "BLUE", "result": "RED",
+                                        "allies": ["a"], "opponents": ["c", "d"]})
+        self.assertEqual(entries["c"]["team"], "RED")
+
+    def test_rebuilt_index_is_sharded_per_season_and_skips_unfinished_matches(self):
+        index = player_index.build_player_index([("m1", {**match(1, "BLUE"), "season_id": 1}),
+                                                 ("m2", {**match(2, "UNFINISHED"), "season_id": 2}),
+                                                 ("m3", {**match(3, "RED", ("a",), ("e",)), "season_id": 2})])
+
+        self.assertEqual(sorted(index), [("a", 1), ("a", 2), ("b", 1), ("c", 1), ("d", 1), ("e", 2)])
+        self.assertEqual(list(index[("a", 1)]), ["m1"])
+        self.assertEqual(list(index[("a", 2)]), ["m3"])
+
+    def test_profile_counts_streaks_and_records_in_timestamp_order(self):
+        matches = [match(4, "BLUE", red=("c", "e")), match(1, "BLUE"), match(2, "BLUE", ("a", "c"), ("b", "d")),
+                   match(3, "RED"), match(5, "BLUE", ("a",), ("d",)), match(6, "UNFINISHED")]
+
+        profile = player_index.player_profile(player_index.index_entry(m, "a") for m in matches)
+
+        self.assertEqual(profile["record"], {"wins": 4, "losses": 1, "games": 5})
+        self.assertEqual((profile["current_streak"], profile["best_streak"]), (2, 2))
+        self.assertEqual(profile["modes"][1], {"wins": 1, "losses": 0, "games": 1})
+        self.assertEqual(profile["allies"]["b"], {"wins": 2, "losses": 1, "games": 3})
+        self.assertEqual(profile["opponents"]["d"], {"wins": 3, "losses": 1, "games": 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
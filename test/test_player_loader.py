@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from src.repos.player_loader import PlayerLoader
+
+
+class Doc:
+    def __init__(self, _id):
+        self.id = _id
+
+
+class TestPlayerLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = []
+
+        async def fetch_many(ids):
+            self.batches.append(ids)
+            return [Doc(_id) for _id in ids if _id != "missing"]
+
+        self.loader = PlayerLoader(fetch_many, batch_size=30)
+
+    def test_lookups_in_the_same_tick_share_one_batch(self):
+        async def run():
+            return await asyncio.gather(self.loader.load_many(["a", "b"]), self.loader.load_many(["c", "a"]),
+                                        self.loader.load("missing"))
+
+        team_a, team_b, missing = asyncio.run(run())
+
+        self.assertEqual([sorted(batch) for batch in self.batches], [["a", "b", "c", "missing"]])
+        self.assertEqual([p.id for p in team_a + team_b], ["a", "b", "c", "a"])
+        self.assertIsNone(missing)
+
+    def test_loaded_players_are_served_from_the_identity_map(self):
+        async def run():
+            first = await self.loader.load("a")
+            return first, await self.loader.load("a")
+
+        first, second = asyncio.run(run())
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.batches), 1)
+
+    def test_large_lists_are_split_in_chunks(self):
+        ids = [f"p{i}" for i in range(70)]
+
+        players = asyncio.run(self.loader.load_many(ids))
+
+        self.assertEqual([p.id for p in players], ids)
+        self.assertEqual([len(batch) for batch in self.batches], [30, 30, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
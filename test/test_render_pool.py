@@ -0,0 +1,85 @@
+import asyncio
+import io
+import os
+import threading
+import unittest
+
+from PIL import Image
+from src.utils.render_pool import RenderPool
+
+NOISE = Image.frombytes("RGB", (680, 281), os.urandom(680 * 281 * 3))
+
+
+def render():
+    image_buffer = io.BytesIO()
+    NOISE.convert("RGBA").save(image_buffer, format="PNG")
+    return image_buffer.getvalue()
+
+
+class TestRenderPool(unittest.TestCase):
+
+    def test_event_loop_keeps_ticking_while_a_render_runs(self):
+        pool = RenderPool(workers=2)
+        release = threading.Event()
+
+        def blocking_render():
+            # Only a loop that keeps running while this blocks can set the event
+            if not release.wait(timeout=5):
+                raise TimeoutError("the event loop was blocked by the render")
+            return render()
+
+        async def scenario():
+            job = asyncio.create_task(pool.run(blocking_render))
+            ticks = 0
+            while pool.running == 0:
+                await asyncio.sleep(0.001)
+            for _ in range(10):
+                await asyncio.sleep(0)
+                ticks += 1
+            self.assertEqual(pool.stats(), {"workers": 2, "queued": 0, "running": 1, "completed": 0})
+            release.set()
+            return ticks, await job
+
+        ticks, png = asyncio.run(scenario())
+        pool.shutdown()
+
+        self.assertEqual(ticks, 10)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+    def test_stats_count_every_run(self):
+        pool = RenderPool(workers=2)
+
+        async def burst():
+            for _ in range(10):
+                await asyncio.gather(pool.run(render), pool.run(render))
+
+        asyncio.run(burst())
+        pool.shutdown()
+
+        self.assertEqual(pool.stats(), {"workers": 2, "queued": 0, "running": 0, "completed": 20})
+
+    def test_cancelled_run_leaves_the_queue(self):
+        pool = RenderPool(workers=1)
+        release = threading.Event()
+
+        async def scenario():
+            busy = asyncio.create_task(pool.run(release.wait))
+            waiting = asyncio.create_task(pool.run(render))
+            while pool.running == 0:
+                await asyncio.sleep(0.001)
+            self.assertEqual(pool.queued, 1)
+
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            release.set()
+            await busy
+
+        asyncio.run(scenario())
+        pool.shutdown()
+        self.assertEqual(pool.stats()["queued"], 0)
+        self.assertEqual(pool.stats()["running"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+from src.repos.settings_mirror import SettingsMirror, deep_merge
+
+
+class TestSettingsMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = []
+        self.mirror = SettingsMirror(on_change=lambda: self.changes.append(True))
+        self.mirror.documents["pool"] = {"list": ["a"]}
+
+    def test_write_is_visible_before_it_completes(self):
+        seen = []
+
+        async def write():
+            seen.append(self.mirror.get("pool")["list"])
+
+        asyncio.run(self.mirror.write({"pool": lambda pool: {"list": pool["list"] + ["b"]}}, write()))
+
+        self.assertEqual(seen, [["a", "b"]])
+        self.assertEqual(self.mirror.get("pool"), {"list": ["a", "b"]})
+        self.assertEqual(len(self.changes), 1)
+
+    def test_failed_write_is_rolled_back(self):
+        async def write():
+            raise RuntimeError("unavailable")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.mirror.write({"pool": lambda pool: {"list": []},
+                                           "teams": lambda teams: {"A": [], "B": []}}, write()))
+
+        self.assertEqual(self.mirror.get("pool"), {"list": ["a"]})
+        self.assertNotIn("teams", self.mirror.documents)
+        self.assertEqual(self.changes, [])
+
+    def test_merge_keeps_other_keys_of_nested_maps(self):
+        config = {"fixed_teams": True, "image_encoding": {"1": "png"}}
+
+        deep_merge(config, {"image_encoding": {"2": "webp"}})
+
+        self.assertEqual(config, {"fixed_teams": True, "image_encoding": {"1": "png", "2": "webp"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
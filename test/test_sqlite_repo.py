@@ -0,0 +1,130 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.repos import sqlite_repo
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def raw_match(hours, result="BLUE", blue=("a",), red=("b",)):
+    return {"timestamp": START + timedelta(hours=hours), "mode": len(blue), "result": result,
+            "blue_team": {"players": list(blue), "champions": ["Ahri"]}, "red_team": {"players": list(red)}}
+
+
+class TestSqliteRepo(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "perso.db")
+        conn = sqlite_repo.connect(self.path)
+        with conn:
+            conn.execute("DELETE FROM seasons")
+            conn.execute('INSERT INTO seasons VALUES (?, ?, ?, ?)', ("s1", 1, sqlite_repo.to_text(START),
+                                                                        sqlite_repo.to_text(sqlite_repo.LAST_SEASON_END)))
+            conn.executemany("INSERT INTO players VALUES (?, ?, ?)", [("a", "A", 1), ("b", "B", 2), ("c", "C", 3)])
+            for _id, match in (("m1", raw_match(1)), ("m2", raw_match(2, "RED")), ("m3", raw_match(3, blue=("a", "c"), red=("b", "b2"))),
+                               ("m4", raw_match(4, "UNFINISHED"))):
+                sqlite_repo.insert_match(conn, _id, match, 1)
+        sqlite_repo.rebuild_aggregates(conn)
+        conn.close()
+
+        sqlite_repo._connection = None
+        self.original_path, sqlite_repo.SQLITE_PATH = sqlite_repo.SQLITE_PATH, self.path
+
+    def tearDown(self):
+        sqlite_repo.executor.submit(lambda: sqlite_repo._connection and sqlite_repo._connection.close()).result()
+        sqlite_repo._connection = None
+        sqlite_repo.SQLITE_PATH = self.original_path
+        self.directory.cleanup()
+
+    def test_history_is_newest_first_and_skips_unfinished_matches(self):
+        async def run():
+            first = await sqlite_repo.get_match_history("a", 2)
+            return first, await sqlite_repo.get_match_history("a", 2, first[1])
+
+        (first, cursor), (second, last_cursor) = asyncio.run(run())
+
+        self.assertEqual([(entry["id"], entry["won"]) for entry in first], [("m3", True), ("m2", False)])
+        self.assertEqual(first[1]["timestamp"], START + timedelta(hours=2))
+        self.assertEqual(cursor, START + timedelta(hours=2))
+        self.assertEqual([entry["id"] for entry in second], ["m1"])
+        self.assertIsNone(last_cursor)
+
+    def test_profile_survives_a_rebuild_of_the_player_index(self):
+        async def run():
+            before = await sqlite_repo.get_player_profile("b")
+            await sqlite_repo.rebuild_player_index()
+            return before, await sqlite_repo.get_player_profile("b")
+
+        before, after = asyncio.run(run())
+
+        self.assertEqual(before, after)
+        self.assertEqual(after["record"], {"wins": 1, "losses": 2, "games": 3})
+        self.assertEqual(after["current_streak"], -1)
+        self.assertEqual(after["allies"], {"b2": {"wins": 0, "losses": 1, "games": 1}})
+
+    def test_stats_are_aggregated_per_mode_and_season(self):
+        async def run():
+            season = await sqlite_repo.get_last_season()
+            return await sqlite_repo.get_player_stats(1, season), await sqlite_repo.get_player_stats(0, None)
+
+        one_vs_one, all_time = asyncio.run(run())
+
+        self.assertEqual(one_vs_one["matches"], 2)
+        self.assertEqual(one_vs_one["players"]["a"], {"wins": 1, "losses": 1, "games": 2})
+        self.assertEqual(all_time["players"]["a"], {"wins": 2, "losses": 1, "games": 3})
+
+    def test_match_flow_and_new_season(self):
+        async def run():
+            await sqlite_repo.set_player("D", SimpleNamespace(id=4))
+            await sqlite_repo.add_active_players([1, 4])
+            players = await sqlite_repo.get_active_players()
+            match_id = await sqlite_repo.store_match({"blue_team": {"players": players[:1], "champions": []},
+                                                      "red_team": {"players": players[1:], "champions": []}})
+            await sqlite_repo.set_match_victory(match_id, "RED")
+            await sqlite_repo.set_match_victory(match_id, "RED")
+            new_season = await sqlite_repo.create_new_season()
+            return (players, new_season, await sqlite_repo.get_player_stats(0, new_season),
+                    await sqlite_repo.get_player_stats(0, None), await sqlite_repo.get_seasons())
+
+        players, new_season, stats, all_time, seasons = asyncio.run(run())
+
+        self.assertEqual([player.get("nome") for player in players], ["A", "D"])
+        self.assertEqual(new_season.get("id"), 2)
+        self.assertEqual(stats["matches"], 0)
+        self.assertEqual(all_time["matches"], 4)
+        self.assertEqual(all_time["players"][players[1].id], {"wins": 1, "losses": 0, "games": 1})
+        self.assertEqual(all_time["players"]["a"], {"wins": 2, "losses": 2, "games": 4})
+        self.assertEqual(seasons[0].get("end"), seasons[1].get("start"))
+
+    def test_result_of_a_closed_season_refreshes_its_frozen_leaderboards(self):
+        async def run():
+            await sqlite_repo.create_new_season()
+            season = await sqlite_repo.get_season_by_id(1)
+            frozen = await sqlite_repo.get_season_leaderboard(1, season)
+            await sqlite_repo.set_match_victory("m1", "RED")
+            return frozen, await sqlite_repo.get_season_leaderboard(1, season)
+
+        frozen, refreshed = asyncio.run(run())
+
+        self.assertEqual(frozen["players"]["a"]["wins"], 1)
+        self.assertEqual(frozen["players"]["a"]["winrate"], 50)
+        self.assertEqual(refreshed["players"]["a"]["wins"], 0)
+        self.assertEqual(refreshed["players"]["a"]["winrate"], 0)
+
+    def test_config_merges_nested_maps(self):
+        async def run():
+            await sqlite_repo.set_config("image_encoding", {"1": "png"})
+            await sqlite_repo.set_config("image_encoding", {"2": "webp"})
+            await sqlite_repo.clear_active_players()
+            return await sqlite_repo.get_config("image_encoding"), await sqlite_repo.get_config("fixed_teams")
+
+        self.assertEqual(asyncio.run(run()), ({"1": "png", "2": "webp"}, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from src.repos.stats_aggregates import (aggregate_keys, apply_deltas, build_aggregates, empty_aggregate, leaderboard,
+                                        merge_deltas, result_deltas, season_id_at)
+
+
+def match(result, blue, red, timestamp=0):
+    return {"result": result, "mode": len(blue), "timestamp": timestamp,
+            "blue_team": {"players": blue}, "red_team": {"players": red}}
+
+
+class TestStatsAggregates(unittest.TestCase):
+
+    def test_match_counts_towards_season_mode_and_all_time_aggregates(self):
+        self.assertEqual(aggregate_keys(2, 5), [(2, 5), (2, 0), (None, 5), (None, 0)])
+        self.assertEqual(aggregate_keys(None, 0), [(None, 0)])
+
+    def test_season_is_found_by_start_timestamp(self):
+        seasons = [(2, 100), (1, 0), (3, 200)]
+
+        self.assertEqual(season_id_at(seasons, 50), 1)
+        self.assertEqual(season_id_at(seasons, 150), 2)
+        self.assertEqual(season_id_at(seasons, 250), 3)
+
+    def test_changing_a_result_moves_the_win(self):
+        game = match("BLUE", ["a", "b"], ["c", "d"])
+        aggregate = apply_deltas(empty_aggregate(1, 2), result_deltas(game, "BLUE"), 1)
+
+        deltas = merge_deltas(result_deltas(game, "BLUE", -1), result_deltas(game, "RED"))
+        apply_deltas(aggregate, deltas, 0)
+
+        self.assertEqual(aggregate["matches"], 1)
+        self.assertEqual(aggregate["players"]["a"], {"wins": 0, "losses": 1, "games": 1})
+        self.assertEqual(aggregate["players"]["c"], {"wins": 1, "losses": 0, "games": 1})
+
+    def test_rebuild_matches_incremental_updates(self):
+        seasons = [(1, 0), (2, 10)]
+        matches = [
+            match("BLUE", ["a", "b"], ["c", "d"], 1),
+            match("RED", ["a", "c"], ["b", "d"], 11),
+            match("UNFINISHED", ["a", "c"], ["b", "d"], 12),
+            match("RED", ["a", "b", "e"], ["c", "d", "f"], 13),
+        ]
+
+        aggregates = build_aggregates(matches, lambda m: season_id_at(seasons, m["timestamp"]))
+
+        self.assertEqual(set(aggregates), {"1_2", "1_0", "2_2", "2_3", "2_0", "all_2", "all_3", "all_0"})
+        self.assertEqual(aggregates["all_0"]["matches"], 3)
+        self.assertEqual(aggregates["all_0"]["players"]["d"], {"wins": 2, "losses": 1, "games": 3})
+        self.assertEqual(aggregates["2_0"]["players"]["a"], {"wins": 0, "losses": 2, "games": 2})
+        self.assertEqual(aggregates["1_2"]["players"]["a"], {"wins": 1, "losses": 0, "games": 1})
+
+    def test_leaderboard_pulls_the_ratings_of_players_with_few_games_to_the_baseline(self):
+        aggregate = empty_aggregate(1, 0)
+        aggregate["players"] = {"a": {"wins": 12, "losses": 4, "games": 16}, "b": {"wins": 1, "losses": 0, "games": 1},
+                                "c": {"wins": 0, "losses": 0, "games": 0}}
+
+        players = leaderboard(aggregate)["players"]
+
+        self.assertEqual((players["a"]["winrate"], players["a"]["rating"]), (75, 75))
+        self.assertEqual(players["b"]["winrate"], 100)
+        self.assertAlmostEqual(players["b"]["rating"], 50 + 50 / 3)
+        self.assertEqual((players["c"]["winrate"], players["c"]["rating"]), (0, 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from PIL import Image
+from src.repos.tile_cache import TileCache
+
+
+def tile(size=10):
+    return Image.new("RGBA", (size, size))
+
+
+class TestTileCache(unittest.TestCase):
+
+    def test_hits_and_misses_are_counted(self):
+        cache = TileCache(max_bytes=10_000)
+
+        first = cache.get_or_create("Ahri", tile)
+        second = cache.get_or_create("Ahri", tile)
+
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 1, "evictions": 0})
+        self.assertEqual(cache.size, 10 * 10 * 4)
+
+    def test_least_recently_used_tile_is_evicted_over_budget(self):
+        cache = TileCache(max_bytes=10 * 10 * 4 * 2)
+
+        cache.get_or_create("Ahri", tile)
+        cache.get_or_create("Annie", tile)
+        cache.get_or_create("Ahri", tile)
+        cache.get_or_create("Ashe", tile)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats["evictions"], 1)
+        cache.get_or_create("Annie", tile)
+        self.assertEqual(cache.stats["misses"], 4)
+
+    def test_tiles_larger_than_budget_are_not_kept(self):
+        cache = TileCache(max_bytes=100)
+
+        cache.get_or_create("Ahri", tile)
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()